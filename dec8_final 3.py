@@ -1,11 +1,21 @@
 import sys
+import os
+import struct
+import itertools
+import hashlib
+import time
+import heapq
+import bisect
 import numpy as np
-import math
 import csv
 import matplotlib.pyplot as plt
 import mplcursors
 from scipy.stats import chi2
 from scipy.optimize import linear_sum_assignment
+from scipy.special import logsumexp
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QLabel, QComboBox, QTextEdit,
                              QHBoxLayout, QSplitter, QCheckBox, QLineEdit, QDialog, QGridLayout, QGroupBox, QRadioButton,
                              QFrame, QSizePolicy, QToolButton, QTabWidget, QMenu, QAction, QTableWidgetItem, QScrollArea,
@@ -27,198 +37,1004 @@ class OutputStream:
     def flush(self): 
         pass  # No need to implement flush for QTextEdit
 
-class CVFilter:
-    def __init__(self):
-        self.Sf = np.zeros((6, 1))  # Filter state vector
-        self.Pf = np.eye(6)  # Filter state covariance matrix
-        self.Sp = np.zeros((6, 1))  # Predicted state vector
-        self.Pp = np.eye(6)  # Predicted state covariance matrix
-        self.plant_noise = 20  # Plant noise covariance
-        self.H = np.eye(3, 6)  # Measurement matrix
+TRANSITION_CACHE_SIZE = 256  # Quantized dts whose matrices the shared transition cache keeps per motion model
+TRANSITION_DT_RESOLUTION = 1e-6  # dt is quantized to this step (seconds) for cache lookups
+
+class TransitionStack:
+    # Cached matrices of one motion model: preallocated stacks with one row per quantized dt.
+    # row_steps holds the step of every row, with the sentinel for unused rows and one extra
+    # sentinel entry at the end; steps and rows are row_steps sorted and the matching row
+    # numbers, so a search never runs off the end of the index.
+    sentinel = np.iinfo(np.int64).max
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.stacks = None  # Allocated on the first insert, once the matrix shapes are known
+        self.used = 0
+        self.row_steps = np.full(capacity + 1, self.sentinel, dtype=np.int64)
+        self.steps = self.row_steps.copy()
+        self.rows = np.arange(capacity + 1)
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.clock = 0
+
+    def find(self, steps):
+        # (row of every step, mask of the cached ones); rows of uncached steps are meaningless
+        pos = np.searchsorted(self.steps, steps)
+        return self.rows[pos], self.steps[pos] == steps
+
+    def insert(self, steps, stacks):
+        # Store the matrices of new (unique) steps in unused rows, then in the least recently used
+        # ones. The caller makes sure enough rows are older than the current clock.
+        if self.stacks is None:
+            self.stacks = tuple(np.empty((self.capacity,) + stack.shape[1:]) for stack in stacks)
+        new_rows = np.arange(self.used, min(self.used + steps.size, self.capacity))
+        self.used += new_rows.size
+        self.last_used[new_rows] = self.clock
+        evict = steps.size - new_rows.size
+        if evict:
+            evicted = np.argpartition(self.last_used, evict - 1)[:evict]
+            self.last_used[evicted] = self.clock
+            new_rows = np.concatenate((new_rows, evicted))
+        for cached, stack in zip(self.stacks, stacks):
+            cached[new_rows] = stack
+        self.row_steps[new_rows] = steps
+        self.rows = np.argsort(self.row_steps)
+        self.steps = self.row_steps[self.rows]
+
+class TransitionCache:
+    # Transition and process-noise matrices keyed by (model key, quantized dt) and shared by every
+    # track. A batch lookup quantizes the dts, finds every track's cached row with one searchsorted,
+    # builds the unique missing dts in one call and gathers the matrices from the stored stacks.
+    # hits and misses count per-track lookups.
+    def __init__(self, max_entries=TRANSITION_CACHE_SIZE, dt_resolution=TRANSITION_DT_RESOLUTION):
+        self.max_entries = max_entries
+        self.dt_resolution = dt_resolution
+        self.entries = {}  # Model key -> TransitionStack
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum(stack.used for stack in self.entries.values())
+
+    def lookup(self, model_key, dt, build):
+        # The stacks build(dt array) returns, gathered for every entry of dt
+        dt = np.asarray(dt, dtype=float).reshape(-1)
+        if not dt.size:
+            return build(dt)
+        steps = np.rint(dt / self.dt_resolution).astype(np.int64)
+        stack = self.entries.get(model_key)
+        if stack is None:
+            stack = self.entries[model_key] = TransitionStack(self.max_entries)
+
+        stack.clock += 1
+        rows, cached = stack.find(steps)
+        stack.last_used[rows[cached]] = stack.clock
+        missed = dt.size - int(np.count_nonzero(cached))
+        self.misses += missed
+        self.hits += dt.size - missed
+        if missed:
+            missing = np.unique(steps[~cached])
+            if missing.size + np.count_nonzero(stack.last_used == stack.clock) > stack.capacity:
+                return build(dt)  # More distinct dts than the cache holds
+            stack.insert(missing, build(missing * self.dt_resolution))
+            rows, _ = stack.find(steps)
+        return tuple(cached_stack[rows] for cached_stack in stack.stacks)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+TRANSITION_CACHE = TransitionCache()  # Shared by every track and motion model
+
+class CVModel:
+    # Constant-velocity motion model, state [x, y, z, vx, vy, vz]
+    dim = 6
+
+    def __init__(self, plant_noise=20, transition_cache=TRANSITION_CACHE):
+        self.plant_noise = plant_noise
+        self.transition_cache = transition_cache
+
+    def initial_states(self, positions, velocities):
+        states = np.zeros((len(positions), self.dim))
+        states[:, 0:3] = positions
+        states[:, 3:6] = velocities
+        return states
+
+    def initial_covariance(self):
+        return np.eye(self.dim)
+
+    def transition(self, dt):
+        # State transition and process noise matrices for every entry of dt, each (len(dt), 6, 6)
+        return self.transition_cache.lookup(('CV', self.plant_noise), dt, self.build_transition)
+
+    def build_transition(self, dt):
+        dt = np.asarray(dt, dtype=float).reshape(-1)
+        axes = np.arange(3)
+        Phi = np.tile(np.eye(6), (len(dt), 1, 1))
+        Phi[:, axes, axes + 3] = dt[:, np.newaxis]
+        Q = np.zeros((len(dt), 6, 6))
+        Q[:, axes, axes] = (dt ** 3 / 3.0)[:, np.newaxis]
+        Q[:, axes, axes + 3] = (dt ** 2 / 2.0)[:, np.newaxis]
+        Q[:, axes + 3, axes] = (dt ** 2 / 2.0)[:, np.newaxis]
+        Q[:, axes + 3, axes + 3] = dt[:, np.newaxis]
+        return Phi, Q * self.plant_noise
+
+    def propagate(self, states, dt):
+        # Predicted states, transition Jacobians and process noise for states (N x 6) over dt (N,)
+        Phi, Q = self.transition(dt)
+        return np.einsum('nij,nj->ni', Phi, states), Phi, Q
+
+class CAModel:
+    # Constant-acceleration motion model, state [x, y, z, vx, vy, vz, ax, ay, az]
+    dim = 9
+
+    def __init__(self, plant_noise=20, transition_cache=TRANSITION_CACHE):
+        self.plant_noise = plant_noise
+        self.transition_cache = transition_cache
+
+    def initial_states(self, positions, velocities):
+        states = np.zeros((len(positions), self.dim))
+        states[:, 0:3] = positions
+        states[:, 3:6] = velocities
+        return states
+
+    def initial_covariance(self):
+        return np.eye(self.dim)
+
+    def transition(self, dt):
+        # State transition and process noise matrices for every entry of dt, each (len(dt), 9, 9)
+        return self.transition_cache.lookup(('CA', self.plant_noise), dt, self.build_transition)
+
+    def build_transition(self, dt):
+        T = np.asarray(dt, dtype=float).reshape(-1, 1)
+        axes = np.arange(3)
+        pos, vel, acc = axes, axes + 3, axes + 6
+        Phi = np.tile(np.eye(9), (len(T), 1, 1))
+        Phi[:, pos, vel] = T
+        Phi[:, pos, acc] = T ** 2 / 2.0
+        Phi[:, vel, acc] = T
+        # White-noise jerk model
+        Q = np.zeros((len(T), 9, 9))
+        Q[:, pos, pos] = T ** 5 / 20.0
+        Q[:, pos, vel] = Q[:, vel, pos] = T ** 4 / 8.0
+        Q[:, pos, acc] = Q[:, acc, pos] = T ** 3 / 6.0
+        Q[:, vel, vel] = T ** 3 / 3.0
+        Q[:, vel, acc] = Q[:, acc, vel] = T ** 2 / 2.0
+        Q[:, acc, acc] = T
+        return Phi, Q * self.plant_noise
+
+    def propagate(self, states, dt):
+        # Predicted states, transition Jacobians and process noise for states (N x 9) over dt (N,)
+        Phi, Q = self.transition(dt)
+        return np.einsum('nij,nj->ni', Phi, states), Phi, Q
+
+class CTModel:
+    # Coordinated-turn motion model for an EKF, state [x, y, z, vx, vy, vz, w] with w the turn rate
+    # in the horizontal plane; height follows constant velocity
+    dim = 7
+    small_turn_rate = 1e-6  # Below this |w * dt| the turn terms use their series expansion
+
+    def __init__(self, plant_noise=20, turn_rate_noise=1e-3, initial_turn_rate_variance=1e-2,
+                 transition_cache=TRANSITION_CACHE):
+        self.plant_noise = plant_noise
+        self.turn_rate_noise = turn_rate_noise
+        self.initial_turn_rate_variance = initial_turn_rate_variance
+        self.transition_cache = transition_cache
+
+    def initial_states(self, positions, velocities):
+        states = np.zeros((len(positions), self.dim))
+        states[:, 0:3] = positions
+        states[:, 3:6] = velocities
+        return states
+
+    def initial_covariance(self):
+        covariance = np.eye(self.dim)
+        covariance[6, 6] = self.initial_turn_rate_variance
+        return covariance
+
+    def process_noise(self, dt):
+        # Process noise for every entry of dt (len(dt), 7, 7); the transition is state dependent and
+        # comes from propagate
+        return self.transition_cache.lookup(('CT', self.plant_noise, self.turn_rate_noise), dt,
+                                            self.build_process_noise)[0]
+
+    def build_process_noise(self, dt):
+        dt = np.asarray(dt, dtype=float).reshape(-1)
+        axes = np.arange(3)
+        Q = np.zeros((len(dt), 7, 7))
+        Q[:, axes, axes] = (dt ** 3 / 3.0)[:, np.newaxis]
+        Q[:, axes, axes + 3] = (dt ** 2 / 2.0)[:, np.newaxis]
+        Q[:, axes + 3, axes] = (dt ** 2 / 2.0)[:, np.newaxis]
+        Q[:, axes + 3, axes + 3] = dt[:, np.newaxis]
+        Q *= self.plant_noise
+        Q[:, 6, 6] = self.turn_rate_noise * dt
+        return (Q,)
+
+    def propagate(self, states, dt):
+        # Predicted states, Jacobians of the turn dynamics and process noise for states (N x 7) over dt (N,)
+        states = np.asarray(states, dtype=float).reshape(-1, 7)
+        T = np.asarray(dt, dtype=float).reshape(-1)
+        vx, vy, w = states[:, 3], states[:, 4], states[:, 6]
+        wT = w * T
+        sin_wT, cos_wT = np.sin(wT), np.cos(wT)
+
+        # a = sin(wT) / w, b = (1 - cos(wT)) / w and their derivatives in w, with the series near w = 0
+        straight = np.abs(wT) < self.small_turn_rate
+        safe_w = np.where(straight, 1.0, w)
+        a = np.where(straight, T - w ** 2 * T ** 3 / 6.0, sin_wT / safe_w)
+        b = np.where(straight, w * T ** 2 / 2.0, (1.0 - cos_wT) / safe_w)
+        da = np.where(straight, -w * T ** 3 / 3.0, (T * cos_wT - a) / safe_w)
+        db = np.where(straight, T ** 2 / 2.0, (T * sin_wT - b) / safe_w)
+
+        predicted = states.copy()
+        predicted[:, 0] += a * vx - b * vy
+        predicted[:, 1] += b * vx + a * vy
+        predicted[:, 2] += T * states[:, 5]
+        predicted[:, 3] = cos_wT * vx - sin_wT * vy
+        predicted[:, 4] = sin_wT * vx + cos_wT * vy
+
+        F = np.tile(np.eye(7), (len(T), 1, 1))
+        F[:, 0, 3], F[:, 0, 4], F[:, 0, 6] = a, -b, da * vx - db * vy
+        F[:, 1, 3], F[:, 1, 4], F[:, 1, 6] = b, a, db * vx + da * vy
+        F[:, 2, 5] = T
+        F[:, 3, 3], F[:, 3, 4], F[:, 3, 6] = cos_wT, -sin_wT, -T * (sin_wT * vx + cos_wT * vy)
+        F[:, 4, 3], F[:, 4, 4], F[:, 4, 6] = sin_wT, cos_wT, T * (cos_wT * vx - sin_wT * vy)
+        return predicted, F, self.process_noise(T)
+
+class KalmanFilterBank:
+    # Kalman filter for every track at once. States and covariances are stacked along the first axis
+    # (slots x n, slots x n x n) and a track owns one slot from allocate() until release(), so predicting
+    # and updating all tracks due in a scan is a handful of batched array operations.
+    def __init__(self, model, capacity=64):
+        self.model = model
+        n = model.dim
+        self.H = np.eye(3, n)  # Measurement matrix
         self.R = np.eye(3)  # Measurement noise covariance
-        self.Meas_Time = 0  # Measured time
-        self.prev_Time = 0
-        self.Q = np.eye(6)
-        self.Phi = np.eye(6)
-        self.Z = np.zeros((3, 1))
-        self.Z1 = np.zeros((3, 1))  # Measurement vector
-        self.Z2 = np.zeros((3, 1))
-        self.first_rep_flag = False
-        self.second_rep_flag = False
         self.gate_threshold = 900.21  # 95% confidence interval for Chi-squared distribution with 3 degrees of freedom
-
-    def initialize_filter_state(self, x, y, z, vx, vy, vz, time):
-        print(f"Initializing filter state with x: {x}, y: {y}, z: {z}, vx: {vx}, vy: {vy}, vz: {vz}, time: {time}")
-        if not self.first_rep_flag:
-            self.Z1 = np.array([[x], [y], [z]])
-            self.Sf[0] = x
-            self.Sf[1] = y
-            self.Sf[2] = z
-            print("check sfffffffffffffff",self.Sf[0])
-            self.Meas_Time = time
-            self.prev_Time = self.Meas_Time
-            self.first_rep_flag = True
-        elif self.first_rep_flag and not self.second_rep_flag:
-            self.Z2 = np.array([[x], [y], [z]])
-            self.prev_Time = self.Meas_Time
-            self.Meas_Time = time
-            dt = self.Meas_Time - self.prev_Time
-            self.Sf[3] = (self.Z2[0] - self.Z1[0]) / dt
-            self.Sf[4] = (self.Z2[1] - self.Z1[1]) / dt
-            self.Sf[5] = (self.Z2[2] - self.Z1[2]) / dt
-            self.second_rep_flag = True
-        else:
-            self.Z = np.array([[x], [y], [z]])
-            self.prev_Time = self.Meas_Time
-            self.Meas_Time = time
-
-    def predict_step(self, current_time):
-        dt = current_time - self.prev_Time
-        print(f"Predict step with dt: {dt}")
-        T_2 = (dt * dt) / 2.0
-        T_3 = (dt * dt * dt) / 3.0
-        self.Phi[0, 3] = dt
-        self.Phi[1, 4] = dt
-        self.Phi[2, 5] = dt
-        self.Q[0, 0] = T_3
-        self.Q[1, 1] = T_3
-        self.Q[2, 2] = T_3
-        self.Q[0, 3] = T_2
-        self.Q[1, 4] = T_2
-        self.Q[2, 5] = T_2
-        self.Q[3, 0] = T_2
-        self.Q[4, 1] = T_2
-        self.Q[5, 2] = T_2
-        self.Q[3, 3] = dt
-        self.Q[4, 4] = dt
-        self.Q[5, 5] = dt
-        self.Q = self.Q * self.plant_noise
-        self.Sp = np.dot(self.Phi, self.Sf)
-        self.Pp = np.dot(np.dot(self.Phi, self.Pf), self.Phi.T) + self.Q
-        self.Meas_Time = current_time
-
-    def update_step(self, Z):
-        print(f"Update step with measurement Z: {Z}")
-        Inn = Z - np.dot(self.H, self.Sp)
-        S = np.dot(self.H, np.dot(self.Pp, self.H.T)) + self.R
-        K = np.dot(np.dot(self.Pp, self.H.T), np.linalg.inv(S))
-        self.Sf = self.Sp + np.dot(K, Inn)
-        self.Pf = np.dot(np.eye(6) - np.dot(K, self.H), self.Pp)
-
-def read_measurements_from_csv(file_path):
-    measurements = []
+        self.Sf = np.zeros((capacity, n))  # Filter states
+        self.Pf = np.tile(np.eye(n), (capacity, 1, 1))  # Filter state covariances
+        self.Sp = np.zeros((capacity, n))  # Predicted states
+        self.Pp = np.tile(np.eye(n), (capacity, 1, 1))  # Predicted state covariances
+        self.state_time = np.zeros(capacity)  # Time of every filter state
+        self.predict_time = np.zeros(capacity)  # Time of every predicted state
+        self.free_slots = list(range(capacity - 1, -1, -1))
+
+    def allocate(self):
+        if not self.free_slots:
+            self.grow()
+        return self.free_slots.pop()
+
+    def release(self, slot):
+        self.free_slots.append(slot)
+
+    def grow(self):
+        capacity = len(self.Sf)
+        n = self.model.dim
+        self.Sf = np.concatenate((self.Sf, np.zeros((capacity, n))))
+        self.Pf = np.concatenate((self.Pf, np.tile(np.eye(n), (capacity, 1, 1))))
+        self.Sp = np.concatenate((self.Sp, np.zeros((capacity, n))))
+        self.Pp = np.concatenate((self.Pp, np.tile(np.eye(n), (capacity, 1, 1))))
+        self.state_time = np.concatenate((self.state_time, np.zeros(capacity)))
+        self.predict_time = np.concatenate((self.predict_time, np.zeros(capacity)))
+        self.free_slots.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def initialize(self, slots, positions, velocities, times):
+        slots = np.asarray(slots, dtype=np.intp)
+        if not slots.size:
+            return
+        states = self.model.initial_states(np.asarray(positions, dtype=float).reshape(-1, 3),
+                                           np.asarray(velocities, dtype=float).reshape(-1, 3))
+        self.Sf[slots] = states
+        self.Sp[slots] = states
+        self.Pf[slots] = self.model.initial_covariance()
+        self.Pp[slots] = self.model.initial_covariance()
+        self.state_time[slots] = times
+        self.predict_time[slots] = times
+
+    def predict_step(self, slots, times):
+        slots = np.asarray(slots, dtype=np.intp)
+        if not slots.size:
+            return
+        dt = np.asarray(times, dtype=float) - self.state_time[slots]
+        Sp, F, Q = self.model.propagate(self.Sf[slots], dt)
+        self.Sp[slots] = Sp
+        self.Pp[slots] = np.matmul(np.matmul(F, self.Pf[slots]), F.transpose(0, 2, 1)) + Q
+        self.predict_time[slots] = times
+
+    def update_step(self, slots, Z):
+        # Z holds one Cartesian report per slot (slots x 3)
+        slots = np.asarray(slots, dtype=np.intp)
+        if not slots.size:
+            return
+        Sp = self.Sp[slots]
+        Pp = self.Pp[slots]
+        PHt = np.matmul(Pp, self.H.T)
+        S = np.matmul(self.H, PHt) + self.R
+        K = np.linalg.solve(S, PHt.transpose(0, 2, 1)).transpose(0, 2, 1)
+        Inn = np.asarray(Z, dtype=float).reshape(-1, 3) - Sp @ self.H.T
+        self.Sf[slots] = Sp + np.einsum('nij,nj->ni', K, Inn)
+        # Joseph form keeps the covariances symmetric and positive definite under EKF linearisation
+        IKH = np.eye(self.model.dim) - np.matmul(K, self.H)
+        self.Pf[slots] = (np.matmul(np.matmul(IKH, Pp), IKH.transpose(0, 2, 1))
+                          + np.matmul(np.matmul(K, self.R), K.transpose(0, 2, 1)))
+        self.state_time[slots] = self.predict_time[slots]
+
+    def snapshot(self, slot):
+        # Copies of (Sf, Sp, Pp, Pf) for one slot, states as column vectors like the track history
+        return (self.Sf[slot].reshape(-1, 1).copy(), self.Sp[slot].reshape(-1, 1).copy(),
+                self.Pp[slot].copy(), self.Pf[slot].copy())
+
+class CAFilter(KalmanFilterBank):
+    # Filter bank running the constant-acceleration model
+    def __init__(self, plant_noise=20, capacity=64):
+        super().__init__(CAModel(plant_noise), capacity)
+
+class CTFilter(KalmanFilterBank):
+    # Extended Kalman filter bank running the coordinated-turn model
+    def __init__(self, plant_noise=20, turn_rate_noise=1e-3, capacity=64):
+        super().__init__(CTModel(plant_noise, turn_rate_noise), capacity)
+
+class AugmentedModel:
+    # Runs a motion model on some axes of a larger state; the remaining axes are carried over unchanged
+    def __init__(self, model, axes, dim):
+        self.model = model
+        self.axes = np.asarray(axes, dtype=np.intp)
+        self.dim = dim
+
+    def initial_states(self, positions, velocities):
+        states = np.zeros((len(positions), self.dim))
+        states[:, self.axes] = self.model.initial_states(positions, velocities)
+        return states
+
+    def initial_covariance(self):
+        covariance = np.eye(self.dim)
+        covariance[np.ix_(self.axes, self.axes)] = self.model.initial_covariance()
+        return covariance
+
+    def propagate(self, states, dt):
+        states = np.asarray(states, dtype=float).reshape(-1, self.dim)
+        sub_states, sub_F, sub_Q = self.model.propagate(states[:, self.axes], dt)
+        predicted = states.copy()
+        predicted[:, self.axes] = sub_states
+        F = np.tile(np.eye(self.dim), (len(states), 1, 1))
+        F[:, self.axes[:, np.newaxis], self.axes] = sub_F
+        Q = np.zeros((len(states), self.dim, self.dim))
+        Q[:, self.axes[:, np.newaxis], self.axes] = sub_Q
+        return predicted, F, Q
+
+IMM_STATE_DIM = 10  # [x, y, z, vx, vy, vz, ax, ay, az, w]
+IMM_MODE_PERSISTENCE = 0.9  # Probability that a track keeps its motion model from one update to the next
+
+def imm_default_models():
+    # CV, CA and CT embedded in the common augmented state
+    return [AugmentedModel(CVModel(), range(6), IMM_STATE_DIM),
+            AugmentedModel(CAModel(), range(9), IMM_STATE_DIM),
+            AugmentedModel(CTModel(), [0, 1, 2, 3, 4, 5, 9], IMM_STATE_DIM)]
+
+class IMMFilterBank(KalmanFilterBank):
+    # Interacting Multiple Model estimator over a common augmented state. Model-conditioned states and
+    # covariances are stacked as (models x slots x n) and (models x slots x n x n), so mixing, update and
+    # combination run once for all models and tracks; only the motion models' propagate is called once
+    # per model. Sf/Sp/Pf/Pp hold the combined estimate used for gating and the track history.
+    def __init__(self, models=None, mode_transition=None, capacity=64):
+        self.models = imm_default_models() if models is None else models
+        num_models = len(self.models)
+        if mode_transition is None:
+            mode_transition = np.full((num_models, num_models), (1.0 - IMM_MODE_PERSISTENCE) / max(num_models - 1, 1))
+            np.fill_diagonal(mode_transition, IMM_MODE_PERSISTENCE if num_models > 1 else 1.0)
+        self.mode_transition = np.asarray(mode_transition, dtype=float)  # [from model, to model]
+        super().__init__(self.models[0], capacity)
+
+        n = self.model.dim
+        self.initial_covariance = np.eye(n)
+        for model in self.models:
+            self.initial_covariance[np.ix_(model.axes, model.axes)] = model.initial_covariance()[np.ix_(model.axes, model.axes)]
+        self.Xf = np.zeros((num_models, capacity, n))  # Model-conditioned filter states
+        self.XPf = np.tile(np.eye(n), (num_models, capacity, 1, 1))
+        self.Xp = np.zeros((num_models, capacity, n))  # Model-conditioned predicted states
+        self.XPp = np.tile(np.eye(n), (num_models, capacity, 1, 1))
+        self.mode_probabilities = np.full((capacity, num_models), 1.0 / num_models)
+        self.predicted_mode_probabilities = np.full((capacity, num_models), 1.0 / num_models)
+
+    def grow(self):
+        capacity = len(self.Sf)
+        super().grow()
+        num_models, n = len(self.models), self.model.dim
+        self.Xf = np.concatenate((self.Xf, np.zeros((num_models, capacity, n))), axis=1)
+        self.XPf = np.concatenate((self.XPf, np.tile(np.eye(n), (num_models, capacity, 1, 1))), axis=1)
+        self.Xp = np.concatenate((self.Xp, np.zeros((num_models, capacity, n))), axis=1)
+        self.XPp = np.concatenate((self.XPp, np.tile(np.eye(n), (num_models, capacity, 1, 1))), axis=1)
+        self.mode_probabilities = np.concatenate(
+            (self.mode_probabilities, np.full((capacity, num_models), 1.0 / num_models)))
+        self.predicted_mode_probabilities = np.concatenate(
+            (self.predicted_mode_probabilities, np.full((capacity, num_models), 1.0 / num_models)))
+
+    def initialize(self, slots, positions, velocities, times):
+        slots = np.asarray(slots, dtype=np.intp)
+        if not slots.size:
+            return
+        super().initialize(slots, positions, velocities, times)
+        self.Pf[slots] = self.initial_covariance
+        self.Pp[slots] = self.initial_covariance
+        self.Xf[:, slots] = self.Sf[slots]
+        self.Xp[:, slots] = self.Sf[slots]
+        self.XPf[:, slots] = self.initial_covariance
+        self.XPp[:, slots] = self.initial_covariance
+        self.mode_probabilities[slots] = 1.0 / len(self.models)
+        self.predicted_mode_probabilities[slots] = 1.0 / len(self.models)
+
+    def combine(self, states, covariances, weights):
+        # Moment-matched estimate of model-conditioned states (models x k x n) with weights (k x models)
+        combined = np.einsum('km,mkn->kn', weights, states)
+        spread = states - combined[np.newaxis]
+        covariance = np.einsum('km,mkab->kab', weights, covariances + spread[..., :, np.newaxis] * spread[..., np.newaxis, :])
+        return combined, covariance
+
+    def predict_models(self, slots, times):
+        # Mixes the model-conditioned estimates of the slots and predicts every model to times.
+        # Returns (states, covariances, predicted mode probabilities (k x models)).
+        mode_probabilities = self.mode_probabilities[slots]
+        predicted_modes = mode_probabilities @ self.mode_transition
+        mixing = mode_probabilities[:, :, np.newaxis] * self.mode_transition[np.newaxis] / predicted_modes[:, np.newaxis, :]
+        states = self.Xf[:, slots]
+        mixed = np.einsum('kij,ikn->jkn', mixing, states)
+        spread = states[:, np.newaxis] - mixed[np.newaxis]
+        mixed_covs = np.einsum('kij,ijkab->jkab', mixing,
+                               self.XPf[:, slots][:, np.newaxis] + spread[..., :, np.newaxis] * spread[..., np.newaxis, :])
+
+        dt = np.asarray(times, dtype=float) - self.state_time[slots]
+        predicted = np.empty_like(mixed)
+        predicted_covs = np.empty_like(mixed_covs)
+        for model_idx, model in enumerate(self.models):
+            predicted[model_idx], F, Q = model.propagate(mixed[model_idx], dt)
+            predicted_covs[model_idx] = np.matmul(np.matmul(F, mixed_covs[model_idx]), F.transpose(0, 2, 1)) + Q
+        return predicted, predicted_covs, predicted_modes
+
+    def predict_step(self, slots, times):
+        slots = np.asarray(slots, dtype=np.intp)
+        if not slots.size:
+            return
+        predicted, predicted_covs, predicted_modes = self.predict_models(slots, times)
+        self.Xp[:, slots] = predicted
+        self.XPp[:, slots] = predicted_covs
+        self.predicted_mode_probabilities[slots] = predicted_modes
+        self.Sp[slots], self.Pp[slots] = self.combine(predicted, predicted_covs, predicted_modes)
+        self.predict_time[slots] = times
+
+    def update_step(self, slots, Z):
+        slots = np.asarray(slots, dtype=np.intp)
+        if not slots.size:
+            return
+        Xp = self.Xp[:, slots]
+        XPp = self.XPp[:, slots]
+        PHt = np.matmul(XPp, self.H.T)
+        S = np.matmul(self.H, PHt) + self.R
+        K = np.linalg.solve(S, np.swapaxes(PHt, -1, -2))
+        K = np.swapaxes(K, -1, -2)
+        Inn = np.asarray(Z, dtype=float).reshape(-1, 3)[np.newaxis] - Xp @ self.H.T
+        Xf = Xp + np.einsum('mkij,mkj->mki', K, Inn)
+        IKH = np.eye(self.model.dim) - np.matmul(K, self.H)
+        XPf = np.matmul(np.matmul(IKH, XPp), np.swapaxes(IKH, -1, -2)) + np.matmul(np.matmul(K, self.R), np.swapaxes(K, -1, -2))
+
+        # Mode probabilities from the Gaussian innovation likelihood of every model
+        _, log_det = np.linalg.slogdet(2 * np.pi * S)
+        log_likelihoods = -0.5 * (np.einsum('mki,mki->mk', Inn, np.linalg.solve(S, Inn[..., np.newaxis])[..., 0]) + log_det)
+        log_modes = np.log(self.predicted_mode_probabilities[slots]) + log_likelihoods.T
+        mode_probabilities = np.exp(log_modes - logsumexp(log_modes, axis=1, keepdims=True))
+
+        self.Xf[:, slots] = Xf
+        self.XPf[:, slots] = XPf
+        self.mode_probabilities[slots] = mode_probabilities
+        self.Sf[slots], self.Pf[slots] = self.combine(Xf, XPf, mode_probabilities)
+        self.state_time[slots] = self.predict_time[slots]
+
+def filter_associated_tracks(kalman_filter, tracks, track_ids, track_states, reports, time, predicted=False):
+    # Filters every track associated in a scan. Poss1 tracks restart from their report with zero
+    # velocity, Tentative1 tracks with the velocity between their last and new report, and Firm tracks
+    # get one batched predict/update, or only the update when predicted says their slots were already
+    # predicted to time. Tracks in the other stages keep their state.
+    track_ids = np.asarray(track_ids, dtype=np.intp)
+    reports = np.asarray(reports, dtype=float).reshape(-1, 3)
+    track_states = np.array(track_states, dtype=object)
+    slots = np.array([tracks[track_id]['filter_slot'] for track_id in track_ids], dtype=np.intp)
+    times = np.full(len(track_ids), time, dtype=float)
+
+    poss = track_states == 'Poss1'
+    kalman_filter.initialize(slots[poss], reports[poss], np.zeros((np.count_nonzero(poss), 3)), times[poss])
+
+    tentative = track_states == 'Tentative1'
+    if tentative.any():
+        last_measurements = np.array([tracks[track_id]['measurements'][-1][0] for track_id in track_ids[tentative]])
+        displacements = reports[tentative] - last_measurements[:, MX:MZ + 1]
+        gaps = (time - last_measurements[:, MT])[:, np.newaxis]
+        # A report at the time of the last one carries no velocity; such tracks restart at rest like Poss1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            velocities = np.where(gaps > 0, displacements / gaps, 0.0)
+        kalman_filter.initialize(slots[tentative], reports[tentative], velocities, times[tentative])
+
+    firm = track_states == 'Firm'
+    if not predicted:
+        kalman_filter.predict_step(slots[firm], times[firm])
+    kalman_filter.update_step(slots[firm], reports[firm])
+
+def append_filter_snapshot(kalman_filter, track):
+    Sf, Sp, Pp, Pf = kalman_filter.snapshot(track['filter_slot'])
+    track['Sf'].append(Sf)
+    track['Sp'].append(Sp)
+    track['Pp'].append(Pp)
+    track['Pf'].append(Pf)
+
+# Column layout of the measurement tables built by measurement_table_from_columns. Each row is a
+# measurement record holding both the spherical report and its Cartesian conversion, so consumers
+# read the cached coordinates instead of converting again.
+MR, MA, ME, MT, MD, MX, MY, MZ = range(8)
+CSV_MEASUREMENT_COLUMNS = (10, 11, 12, 13, 14)  # MR, MA, ME, MT, MD columns of the input CSV
+
+MEASUREMENT_CHUNK_ROWS = 65536  # Rows parsed per block by the streaming loaders
+
+def measurement_table_from_columns(raw):
+    # Build the N x 8 table from the raw MR/MA/ME/MT/MD columns, converting all rows to Cartesian in one pass
+    table = np.empty((raw.shape[0], 8))
+    table[:, :MX] = raw
+    table[:, MX:MZ + 1] = sph2cart_batch(raw[:, MR:ME + 1])
+    return table
+
+def iter_csv_measurement_chunks(file_path, chunk_rows=MEASUREMENT_CHUNK_ROWS):
     with open(file_path, 'r') as file:
-        reader = csv.reader(file)
-        next(reader)  # Skip header if exists
-        for row in reader:
-            mr = float(row[10])  # MR column
-            ma = float(row[11])  # MA column
-            me = float(row[12])  # ME column
-            mt = float(row[13])  # MT column
-            md = float(row[14])
-            x, y, z = sph2cart(ma, me, mr)  # Convert spherical to Cartesian coordinates
-            print(f"Converted spherical to Cartesian: azimuth={ma}, elevation={me}, range={mr} -> x={x}, y={y}, z={z}")
-            measurements.append((mr, ma, me, mt, md, x, y, z))
-    return measurements
+        next(file, None)  # Skip header if exists
+        while True:
+            lines = list(itertools.islice(file, chunk_rows))
+            if not lines:
+                break
+            raw = np.loadtxt(lines, delimiter=',', usecols=CSV_MEASUREMENT_COLUMNS, ndmin=2)
+            yield measurement_table_from_columns(raw)
+
+# Binary measurement store: a fixed header (magic + record count) followed by
+# little-endian float64 records laid out like the measurement table above
+MEASUREMENT_FILE_MAGIC = b'KFMEAS01'
+MEASUREMENT_FILE_EXT = '.kfm'
+MEASUREMENT_HEADER_SIZE = 16
+MEASUREMENT_RECORD_DTYPE = np.dtype('<f8')
+MEASUREMENT_RECORD_FIELDS = 8
+
+def write_measurements_binary(file_path, chunks):
+    # Write measurement tables chunk by chunk and patch the record count into the header at the end
+    count = 0
+    with open(file_path, 'wb') as file:
+        file.write(MEASUREMENT_FILE_MAGIC)
+        file.write(struct.pack('<Q', 0))
+        for chunk in chunks:
+            chunk = np.ascontiguousarray(chunk, dtype=MEASUREMENT_RECORD_DTYPE).reshape(-1, MEASUREMENT_RECORD_FIELDS)
+            chunk.tofile(file)
+            count += chunk.shape[0]
+        file.seek(len(MEASUREMENT_FILE_MAGIC))
+        file.write(struct.pack('<Q', count))
+
+def convert_csv_to_binary(csv_path, binary_path=None):
+    # Stream the CSV through in chunks so the whole file is never held in memory
+    if binary_path is None:
+        binary_path = os.path.splitext(csv_path)[0] + MEASUREMENT_FILE_EXT
+    write_measurements_binary(binary_path, iter_csv_measurement_chunks(csv_path))
+    print(f"Converted {csv_path} to binary measurement file {binary_path}")
+    return binary_path
+
+def load_measurements_binary(file_path):
+    # Memory-map the records read-only; pages come from the OS page cache and are shared across runs
+    with open(file_path, 'rb') as file:
+        header = file.read(MEASUREMENT_HEADER_SIZE)
+    if len(header) != MEASUREMENT_HEADER_SIZE or header[:8] != MEASUREMENT_FILE_MAGIC:
+        raise ValueError(f"Not a binary measurement file: {file_path}")
+    count = struct.unpack('<Q', header[8:])[0]
+    record_size = MEASUREMENT_RECORD_FIELDS * MEASUREMENT_RECORD_DTYPE.itemsize
+    if os.path.getsize(file_path) < MEASUREMENT_HEADER_SIZE + count * record_size:
+        raise ValueError(f"Binary measurement file is truncated: {file_path}")
+    if count == 0:
+        return np.empty((0, MEASUREMENT_RECORD_FIELDS), dtype=MEASUREMENT_RECORD_DTYPE)
+    return np.memmap(file_path, dtype=MEASUREMENT_RECORD_DTYPE, mode='r', offset=MEASUREMENT_HEADER_SIZE,
+                     shape=(count, MEASUREMENT_RECORD_FIELDS))
+
+# On-disk cache of parsed and converted CSV inputs, stored in the binary measurement format
+MEASUREMENT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.kalman_filter_cache')
+MEASUREMENT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+def file_fingerprint(file_path):
+    # Key on path, size, mtime and content hash so edited or replaced recordings never hit a stale entry
+    stat = os.stat(file_path)
+    content = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            content.update(block)
+    key = hashlib.blake2b(digest_size=16)
+    key.update(f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|".encode())
+    key.update(content.digest())
+    return key.hexdigest()
+
+def evict_measurement_cache(cache_dir=MEASUREMENT_CACHE_DIR, max_bytes=MEASUREMENT_CACHE_MAX_BYTES, keep=None):
+    # Remove least recently used entries until the cache fits in max_bytes
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if not name.endswith(MEASUREMENT_FILE_EXT) or path == keep:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    if keep is not None and os.path.exists(keep):
+        total += os.path.getsize(keep)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+def cached_measurement_file(file_path, cache_dir=MEASUREMENT_CACHE_DIR, max_bytes=MEASUREMENT_CACHE_MAX_BYTES):
+    # Return a binary measurement file with the parsed contents of file_path, converting it on a miss.
+    # Binary inputs are already parsed and are returned as they are.
+    if file_path.lower().endswith(MEASUREMENT_FILE_EXT):
+        return file_path
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, file_fingerprint(file_path) + MEASUREMENT_FILE_EXT)
+    if os.path.exists(cache_path):
+        os.utime(cache_path)  # Mark as recently used
+        print(f"Using cached measurements for {file_path}")
+        return cache_path
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        convert_csv_to_binary(file_path, tmp_path)
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict_measurement_cache(cache_dir, max_bytes, keep=cache_path)
+    return cache_path
+
+def iter_measurement_chunks(file_path, chunk_rows=MEASUREMENT_CHUNK_ROWS):
+    # Yield the measurement table in blocks of at most chunk_rows rows
+    if file_path.lower().endswith(MEASUREMENT_FILE_EXT):
+        table = load_measurements_binary(file_path)
+        for start in range(0, table.shape[0], chunk_rows):
+            yield table[start:start + chunk_rows]
+    else:
+        yield from iter_csv_measurement_chunks(file_path, chunk_rows)
+
+DEG2RAD = np.pi / 180
+RAD2DEG = 180 / np.pi
 
+# sph2cart and cart2sph accept scalars or equally shaped arrays
 def sph2cart(az, el, r):
-    x = r * np.cos(el * np.pi / 180) * np.sin(az * np.pi / 180)
-    y = r * np.cos(el * np.pi / 180) * np.cos(az * np.pi / 180)
-    z = r * np.sin(el * np.pi / 180)
+    az = np.multiply(az, DEG2RAD)
+    el = np.multiply(el, DEG2RAD)
+    r_cos_el = r * np.cos(el)
+    x = r_cos_el * np.sin(az)
+    y = r_cos_el * np.cos(az)
+    z = r * np.sin(el)
     return x, y, z
 
 def cart2sph(x, y, z):
-    r = np.sqrt(x**2 + y**2 + z**2)
-    el = math.atan2(z, np.sqrt(x**2 + y**2)) * 180 / np.pi
-    az = math.atan2(y, x)
-
-    if x > 0.0:
-        az = np.pi / 2 - az
-    else:
-        az = 3 * np.pi / 2 - az
-
-    az = az * 180 / np.pi
-
-    if az < 0.0:
-        az = 360 + az
-
-    if az > 360:
-        az = az - 360
-
-    print(f"Converted Cartesian to spherical: x={x}, y={y}, z={z} -> range={r}, azimuth={az}, elevation={el}")
-    return r, az, el
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    z = np.asarray(z, dtype=float)
+    ground = np.sqrt(x * x + y * y)
+    r = np.sqrt(ground * ground + z * z)
+    el = np.arctan2(z, ground) * RAD2DEG
+    az = np.arctan2(y, x)
+
+    # Azimuth measured clockwise from the y axis, wrapped into [0, 360]
+    az = np.where(x > 0.0, np.pi / 2 - az, 3 * np.pi / 2 - az) * RAD2DEG
+    az = np.where(az < 0.0, az + 360, az)
+    az = np.where(az > 360, az - 360, az)
+
+    return r[()], az[()], el[()]
+
+# N x 3 kernels using the column order of the measurement table: (range, az, el) <-> (x, y, z)
+def sph2cart_batch(rae):
+    rae = np.asarray(rae, dtype=float)
+    xyz = np.empty(rae.shape)
+    xyz[..., 0], xyz[..., 1], xyz[..., 2] = sph2cart(rae[..., 1], rae[..., 2], rae[..., 0])
+    return xyz
+
+def cart2sph_batch(xyz):
+    xyz = np.asarray(xyz, dtype=float)
+    rae = np.empty(xyz.shape)
+    rae[..., 0], rae[..., 1], rae[..., 2] = cart2sph(xyz[..., 0], xyz[..., 1], xyz[..., 2])
+    return rae
+
+def benchmark_coordinate_kernels(n=1000000, repeat=5, scalar_n=10000):
+    # Per-measurement cost of the batch kernels against one scalar call per measurement
+    rng = np.random.default_rng(0)
+    rae = np.column_stack((rng.uniform(100.0, 50000.0, n), rng.uniform(0.0, 360.0, n), rng.uniform(-5.0, 60.0, n)))
+    xyz = sph2cart_batch(rae)
+    for name, kernel, data in (("sph2cart_batch", sph2cart_batch, rae), ("cart2sph_batch", cart2sph_batch, xyz)):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            kernel(data)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name}: {best * 1e9 / n:.1f} ns per measurement ({n} measurements)")
+    for name, kernel, data in (("sph2cart", lambda row: sph2cart(row[1], row[2], row[0]), rae[:scalar_n]),
+                               ("cart2sph", lambda row: cart2sph(*row), xyz[:scalar_n])):
+        start = time.perf_counter()
+        for row in data:
+            kernel(row)
+        elapsed = time.perf_counter() - start
+        print(f"{name} (scalar calls): {elapsed * 1e9 / len(data):.1f} ns per measurement ({len(data)} measurements)")
+
+def benchmark_transition_cache(track_counts=(5, 50, 500), scans=2000, scan_interval=1.0):
+    # Per-scan cost of the cached matrices against building them on every call. In "scan dt" the
+    # tracks of a scan were last updated one to three scans back at one of ten report offsets, in
+    # shuffled order and with a varying track count, like the batches main() predicts; "fresh dt"
+    # draws every dt from a continuous range so nothing is ever reused.
+    rng = np.random.default_rng(0)
+    for model, direct, cached in ((CVModel(), 'build_transition', 'transition'),
+                                  (CAModel(), 'build_transition', 'transition'),
+                                  (CTModel(), 'build_process_noise', 'process_noise')):
+        for n in track_counts:
+            scan_dts = [rng.integers(1, 4, size) * scan_interval + rng.integers(0, 10, size) * 0.005
+                        for size in rng.integers(max(n - n // 10, 1), n + n // 10 + 1, scans)]
+            fresh_dts = [rng.uniform(0.5, 3.5, n) for _ in range(scans)]
+            timings = []
+            for name, kernel, batches in (("direct", getattr(model, direct), scan_dts),
+                                          ("scan dt", getattr(model, cached), scan_dts),
+                                          ("fresh dt", getattr(model, cached), fresh_dts)):
+                model.transition_cache = TransitionCache()
+                start = time.perf_counter()
+                for dt in batches:
+                    kernel(dt)
+                timings.append(f"{name} {(time.perf_counter() - start) * 1e6 / scans:.1f} us")
+            print(f"{type(model).__name__}, {n} tracks: " + ", ".join(timings))
+
+def segment_measurement_groups(times, max_time_diff=0.050):
+    # Return (starts, stops) index arrays of the groups in a time-sorted column. A group holds
+    # every measurement within max_time_diff of the group's first measurement.
+    times = np.asarray(times)
+    n = times.shape[0]
+    if n == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    # Gaps wider than the window always start a new group
+    breaks = np.flatnonzero(np.diff(times) > max_time_diff) + 1
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [n]))
+
+    # Runs longer than the window are split again, anchoring each group at its first measurement
+    long_runs = np.flatnonzero(times[stops - 1] - times[starts] > max_time_diff)
+    if long_runs.size:
+        # End of the window opened by every measurement, settled so rounding matches
+        # the measurement[3] - base_time <= max_time_diff test exactly
+        index = np.arange(n)
+        window_end = np.searchsorted(times, times + max_time_diff, side='right')
+        while True:
+            ahead = np.flatnonzero(window_end < n)
+            grow = ahead[times[window_end[ahead]] - times[ahead] <= max_time_diff]
+            if not grow.size:
+                break
+            window_end[grow] += 1
+        while True:
+            behind = np.flatnonzero(window_end > index + 1)
+            shrink = behind[times[window_end[behind] - 1] - times[behind] > max_time_diff]
+            if not shrink.size:
+                break
+            window_end[shrink] -= 1
+
+        # Follow the chain of windows through each long run
+        window_end = window_end.tolist()
+        run_starts = starts.tolist()
+        run_stops = stops.tolist()
+        extra_starts = []
+        for run in long_runs.tolist():
+            start = window_end[run_starts[run]]
+            while start < run_stops[run]:
+                extra_starts.append(start)
+                start = window_end[start]
+        starts = np.sort(np.concatenate((starts, np.array(extra_starts, dtype=np.intp))))
+        stops = np.append(starts[1:], n)
+
+    return starts, stops
 
 def form_measurement_groups(measurements, max_time_diff=0.050):
-    measurement_groups = []
-    current_group = []
-    base_time = measurements[0][3]
-
-    for measurement in measurements:
-        if measurement[3] - base_time <= max_time_diff:
-            current_group.append(measurement)
-        else:
-            measurement_groups.append(current_group)
-            current_group = [measurement]
-            base_time = measurement[3]
-
-    if current_group:
-        measurement_groups.append(current_group)
-
-    return measurement_groups
-
-def form_clusters_via_association(tracks, reports, kalman_filter):
-    association_list = []
-    cov_inv = np.linalg.inv(kalman_filter.Pp[:3, :3])  # 3x3 covariance matrix for position only
-    chi2_threshold = kalman_filter.gate_threshold
-
-    for i, track in enumerate(tracks):
-        for j, report in enumerate(reports):
-            distance = mahalanobis_distance(track, report, cov_inv)
-            if distance < chi2_threshold:
-                association_list.append((i, j))
+    # Groups are views into the measurement table, not copies
+    measurements = np.asarray(measurements)
+    if measurements.shape[0] == 0:
+        return []
+    starts, stops = segment_measurement_groups(measurements[:, MT], max_time_diff)
+    return [measurements[start:stop] for start, stop in zip(starts, stops)]
+
+def iter_measurement_groups(chunks, max_time_diff=0.050):
+    # Yield measurement groups one at a time. The last group of each chunk is held back
+    # until the next chunk shows where it ends, so only one chunk is in memory at a time.
+    pending = None
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        if pending is not None:
+            chunk = np.concatenate((pending, chunk))
+        groups = form_measurement_groups(chunk, max_time_diff)
+        for group in groups[:-1]:
+            yield group
+        pending = groups[-1].copy()  # Don't keep the whole chunk alive through the view
+    if pending is not None:
+        yield pending
+
+def gated_pair_clusters(track_idx, report_idx, num_tracks, num_reports):
+    # Connected components of the bipartite track/report gating graph. Returns a list of
+    # (track indices, report indices) arrays, one per cluster, ordered by lowest track index.
+    track_idx = np.asarray(track_idx, dtype=np.intp)
+    report_idx = np.asarray(report_idx, dtype=np.intp)
+    if track_idx.size == 0:
+        return []
+    num_nodes = num_tracks + num_reports
+    graph = coo_matrix((np.ones(track_idx.size, dtype=np.int8), (track_idx, num_tracks + report_idx)),
+                       shape=(num_nodes, num_nodes))
+    _, labels = connected_components(graph, directed=False)
+
+    # Only nodes on at least one gated pair belong to a cluster
+    gated_tracks = np.unique(track_idx)
+    gated_reports = np.unique(report_idx)
+    cluster_labels, first_node = np.unique(labels[gated_tracks], return_index=True)
+    cluster_labels = cluster_labels[np.argsort(first_node)]
+
+    track_order = np.argsort(labels[gated_tracks], kind='stable')
+    report_order = np.argsort(labels[num_tracks + gated_reports], kind='stable')
+    sorted_track_labels = labels[gated_tracks][track_order]
+    sorted_report_labels = labels[num_tracks + gated_reports][report_order]
 
     clusters = []
-    while association_list:
-        cluster_tracks = set()
-        cluster_reports = set()
-        stack = [association_list.pop(0)]
-
-        while stack:
-            track_idx, report_idx = stack.pop()
-            cluster_tracks.add(track_idx)
-            cluster_reports.add(report_idx)
-            new_assoc = [(t, r) for t, r in association_list if t == track_idx or r == report_idx]
-            for assoc in new_assoc:
-                if assoc not in stack:
-                    stack.append(assoc)
-            association_list = [assoc for assoc in association_list if assoc not in new_assoc]
-
-        clusters.append((list(cluster_tracks), [reports[r] for r in cluster_reports]))
-
+    for label in cluster_labels:
+        t0, t1 = np.searchsorted(sorted_track_labels, [label, label + 1])
+        r0, r1 = np.searchsorted(sorted_report_labels, [label, label + 1])
+        clusters.append((gated_tracks[track_order[t0:t1]], gated_reports[report_order[r0:r1]]))
     return clusters
 
-def mahalanobis_distance(track, report, cov_inv):
-    residual = np.array(report) - np.array(track)
-    distance = np.dot(np.dot(residual.T, cov_inv), residual)
-    return distance
-
-def select_best_report(cluster_tracks, cluster_reports, kalman_filter):
-    cov_inv = np.linalg.inv(kalman_filter.Pp[:3, :3])
-
-    best_report = None
-    best_track_idx = None
-    max_weight = -np.inf
-
-    for i, track in enumerate(cluster_tracks):
-        for j, report in enumerate(cluster_reports):
-            residual = np.array(report) - np.array(track)
-            weight = np.exp(-0.5 * np.dot(np.dot(residual.T, cov_inv), residual))
-            if weight > max_weight:
-                max_weight = weight
-                best_report = report
-                best_track_idx = i
+def cluster_pair_layout(track_idx, report_idx, clusters, num_tracks, num_reports):
+    # Local row/column of every track and report inside its cluster, and the pairs of every cluster
+    # as pair_order[pair_bounds[c]:pair_bounds[c + 1]]. Returns (track_local, report_local, pair_order, pair_bounds).
+    track_local = np.empty(num_tracks, dtype=np.intp)
+    report_local = np.empty(num_reports, dtype=np.intp)
+    track_cluster = np.empty(num_tracks, dtype=np.intp)
+    for cluster_idx, (cluster_tracks, cluster_reports) in enumerate(clusters):
+        track_local[cluster_tracks] = np.arange(len(cluster_tracks))
+        report_local[cluster_reports] = np.arange(len(cluster_reports))
+        track_cluster[cluster_tracks] = cluster_idx
+    pair_order = np.argsort(track_cluster[track_idx], kind='stable')
+    pair_bounds = np.searchsorted(track_cluster[track_idx][pair_order], np.arange(len(clusters) + 1))
+    return track_local, report_local, pair_order, pair_bounds
+
+def gated_clusters(tracks, reports, kalman_filter, innovation_covs=None, coarse_gating=None, candidate_pairs=None):
+    # Gated pairs of a scan and the clusters they form: (track indices, report indices, clusters)
+    cov = gating_covariances(kalman_filter, innovation_covs)
+    chi2_threshold = kalman_filter.gate_threshold
 
-    return best_track_idx, best_report
+    track_idx, report_idx, _ = gate_pairs(tracks, reports, cov, chi2_threshold, coarse_gating, candidate_pairs)
+    return track_idx, report_idx, gated_pair_clusters(track_idx, report_idx, len(tracks), len(reports))
+
+def innovation_covariances(track_covariances, kalman_filter):
+    # Innovation covariance S = H Pp H' + R of every track from its own predicted covariance,
+    # stacked as a tracks x 3 x 3 array
+    H = kalman_filter.H
+    Pp = np.asarray(track_covariances, dtype=float).reshape(-1, H.shape[1], H.shape[1])
+    return np.matmul(np.matmul(H, Pp), H.T) + kalman_filter.R
+
+def gating_covariances(kalman_filter, innovation_covs=None):
+    # Per-track innovation covariances when given, otherwise the innovation covariance of a newly
+    # initialised track, shared by all tracks
+    if innovation_covs is None:
+        return innovation_covariances(kalman_filter.model.initial_covariance(), kalman_filter)[0]
+    return np.asarray(innovation_covs, dtype=float).reshape(-1, 3, 3)
+
+def whitening_factors(covs):
+    # Inverse Cholesky factors W, with W' W = inv(cov), for one covariance or a stack of them.
+    # The whole stack is factorised in one batched call.
+    try:
+        return np.linalg.inv(np.linalg.cholesky(covs))
+    except np.linalg.LinAlgError:
+        # Some covariance is not positive definite; whiten with clipped eigenvalues instead
+        eigvals, eigvecs = np.linalg.eigh(covs)
+        eigvals = np.maximum(eigvals, np.finfo(float).tiny)
+        return np.swapaxes(eigvecs, -1, -2) / np.sqrt(eigvals)[..., np.newaxis]
+
+def squared_mahalanobis(residuals, covs):
+    # Squared Mahalanobis norm of every 3-vector in residuals (shape ... x 3). covs is a single
+    # 3x3 covariance or a stack that broadcasts against the leading axes of residuals.
+    whitened = np.einsum('...ij,...j->...i', whitening_factors(covs), residuals)
+    return np.einsum('...i,...i->...', whitened, whitened)
+
+def mahalanobis_distance_matrix(tracks, reports, cov):
+    # Squared Mahalanobis distance of every report from every track as a tracks x reports matrix.
+    # cov is shared by all tracks (3 x 3) or given per track (tracks x 3 x 3).
+    tracks = np.asarray(tracks, dtype=float).reshape(-1, 3)
+    reports = np.asarray(reports, dtype=float).reshape(-1, 3)
+    cov = np.asarray(cov, dtype=float)
+    if cov.ndim == 3:
+        cov = cov[:, np.newaxis]
+    return squared_mahalanobis(reports[np.newaxis, :, :] - tracks[:, np.newaxis, :], cov)
+
+# Below this many track/report pairs the dense distance matrix is cheaper than building a KD-tree
+COARSE_GATING_MIN_PAIRS = 4096
+
+def gate_pairs(tracks, reports, cov, gate_threshold, coarse_gating=None, candidate_pairs=None):
+    # Track/report pairs whose squared Mahalanobis distance is under gate_threshold, returned as
+    # (track indices, report indices, distances). cov is shared (3 x 3) or per track (tracks x 3 x 3).
+    # With coarse gating a KD-tree over the reports finds, for every track, the reports inside the
+    # Euclidean ball that encloses its gate ellipsoid; only those candidates get the exact check.
+    # candidate_pairs (track indices, report indices) from an earlier gate restricts the pairs further:
+    # the exact check runs on its intersection with the KD-tree candidates.
+    tracks = np.asarray(tracks, dtype=float).reshape(-1, 3)
+    reports = np.asarray(reports, dtype=float).reshape(-1, 3)
+    cov = np.asarray(cov, dtype=float)
+    if candidate_pairs is not None:
+        candidate_tracks, candidate_reports = (np.asarray(idx, dtype=np.intp) for idx in candidate_pairs)
+    if coarse_gating is None:
+        num_pairs = tracks.shape[0] * reports.shape[0] if candidate_pairs is None else candidate_tracks.size
+        coarse_gating = num_pairs >= COARSE_GATING_MIN_PAIRS
+
+    radii = np.array([np.nan])
+    if coarse_gating and tracks.shape[0] and reports.shape[0]:
+        # d^2 < gate_threshold implies |residual|^2 < gate_threshold * largest eigenvalue of cov
+        radii = np.sqrt(gate_threshold * np.linalg.eigvalsh(cov)[..., -1])
+    if np.all(np.isfinite(radii)):
+        neighbours = cKDTree(reports).query_ball_point(tracks, np.broadcast_to(radii, tracks.shape[:1]))
+        counts = np.fromiter(map(len, neighbours), dtype=np.intp, count=len(neighbours))
+        track_idx = np.repeat(np.arange(tracks.shape[0]), counts)
+        report_idx = np.fromiter(itertools.chain.from_iterable(neighbours), dtype=np.intp, count=counts.sum())
+        if candidate_pairs is not None:
+            # Keep the ball-query pairs that also passed the earlier gate
+            keep = np.isin(track_idx * reports.shape[0] + report_idx,
+                           candidate_tracks * reports.shape[0] + candidate_reports)
+            track_idx, report_idx = track_idx[keep], report_idx[keep]
+    elif candidate_pairs is not None:
+        track_idx, report_idx = candidate_tracks, candidate_reports
+    else:
+        distances = mahalanobis_distance_matrix(tracks, reports, cov)
+        track_idx, report_idx = np.nonzero(distances < gate_threshold)
+        return track_idx, report_idx, distances[track_idx, report_idx]
+
+    distances = squared_mahalanobis(reports[report_idx] - tracks[track_idx], cov[track_idx] if cov.ndim == 3 else cov)
+    keep = distances < gate_threshold
+    return track_idx[keep], report_idx[keep], distances[keep]
+
+def predicted_range_rates(states):
+    # Range rate (p . v) / |p| of every track from its Cartesian state [x, y, z, vx, vy, vz, ...];
+    # NaN for a track at the origin
+    states = np.asarray(states, dtype=float)
+    states = states.reshape(states.shape[0], -1)
+    positions = states[:, 0:3]
+    velocities = states[:, 3:6]
+    ranges = np.sqrt(np.einsum('ij,ij->i', positions, positions))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ranges > 0, np.einsum('ij,ij->i', positions, velocities) / ranges, np.nan)
+
+def range_rate_gate_pairs(predicted_rates, report_dopplers, doppler_threshold):
+    # Track/report pairs whose measured Doppler is within doppler_threshold of the track's predicted
+    # range rate, as (track indices, report indices). A track without a finite prediction keeps every report.
+    predicted_rates = np.asarray(predicted_rates, dtype=float)
+    report_dopplers = np.asarray(report_dopplers, dtype=float)
+    order = np.argsort(report_dopplers, kind='stable')
+    sorted_dopplers = report_dopplers[order]
+    unknown = ~np.isfinite(predicted_rates)
+    starts = np.where(unknown, 0, np.searchsorted(sorted_dopplers, predicted_rates - doppler_threshold, side='right'))
+    stops = np.where(unknown, len(order), np.searchsorted(sorted_dopplers, predicted_rates + doppler_threshold, side='left'))
+    counts = np.maximum(stops - starts, 0)
+    track_idx = np.repeat(np.arange(len(predicted_rates)), counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return track_idx, order[np.repeat(starts, counts) + within]
+
+def select_best_report(cluster_tracks, cluster_reports, kalman_filter, innovation_covs=None):
+    if len(cluster_tracks) == 0 or len(cluster_reports) == 0:
+        return None, None
+
+    # The highest weight exp(-d/2) belongs to the smallest distance d
+    distances = mahalanobis_distance_matrix(cluster_tracks, cluster_reports,
+                                            gating_covariances(kalman_filter, innovation_covs))
+    best_track_idx, best_report_idx = np.unravel_index(np.argmin(distances), distances.shape)
+
+    return best_track_idx, cluster_reports[best_report_idx]
 
 def select_initiation_mode(mode):
     if mode == '3-state':
@@ -233,68 +1049,339 @@ def select_initiation_mode(mode):
 def doppler_correlation(doppler_1, doppler_2, doppler_threshold):
     return abs(doppler_1 - doppler_2) < doppler_threshold
 
-def correlation_check(track, measurement, doppler_threshold, range_threshold):
-    last_measurement = track['measurements'][-1][0]
-    last_cartesian = sph2cart(last_measurement[0], last_measurement[1], last_measurement[2])
-    measurement_cartesian = sph2cart(measurement[0], measurement[1], measurement[2])
-    distance = np.linalg.norm(np.array(measurement_cartesian) - np.array(last_cartesian))
-
-    doppler_correlated = doppler_correlation(measurement[4], last_measurement[4], doppler_threshold)
-    range_satisfied = distance < range_threshold
-
-    return doppler_correlated and range_satisfied
-
-def initialize_filter_state(kalman_filter, x, y, z, vx, vy, vz, time):
-    kalman_filter.initialize_filter_state(x, y, z, vx, vy, vz, time)
-
-def perform_jpda(tracks, reports, kalman_filter):
-    clusters = form_clusters_via_association(tracks, reports, kalman_filter)
+class TrackLookupIndex:
+    # Candidate tracks for a single report. Tracks are held in a uniform grid over their last
+    # Cartesian position (cells range_threshold wide) and in a list sorted by their last Doppler.
+    # A report takes whichever prefilter is smaller: the Doppler window found by binary search, on
+    # which only the range check remains, or the adjacent grid cells, which still need the Doppler
+    # check. Tracks are keyed by their position in the tracks list; rebuild after tracks are deleted.
+    def __init__(self, range_threshold, doppler_threshold):
+        self.range_threshold = range_threshold
+        self.doppler_threshold = doppler_threshold
+        self.cells = {}  # (cx, cy, cz) -> set of track positions
+        self.keys = []  # Cell key of every track position
+        self.dopplers = []  # Sorted (last Doppler, track position)
+        self.track_dopplers = []  # Last Doppler of every track position
+
+    def cell_key(self, measurement):
+        return tuple(np.floor(measurement[MX:MZ + 1] / self.range_threshold).astype(int).tolist())
+
+    def rebuild(self, tracks):
+        self.cells = {}
+        self.keys = []
+        self.dopplers = []
+        self.track_dopplers = []
+        for track in tracks:
+            self.add(track)
+
+    def add(self, track):
+        # Index a track appended at the end of the tracks list
+        last_measurement = track['measurements'][-1][0]
+        track_pos = len(self.keys)
+        key = self.cell_key(last_measurement)
+        self.cells.setdefault(key, set()).add(track_pos)
+        self.keys.append(key)
+        doppler = float(last_measurement[MD])
+        bisect.insort(self.dopplers, (doppler, track_pos))
+        self.track_dopplers.append(doppler)
+
+    def update(self, track_pos, track):
+        # Move a track after a measurement was appended to it
+        last_measurement = track['measurements'][-1][0]
+        key = self.cell_key(last_measurement)
+        old_key = self.keys[track_pos]
+        if key != old_key:
+            self.cells[old_key].discard(track_pos)
+            if not self.cells[old_key]:
+                del self.cells[old_key]
+            self.cells.setdefault(key, set()).add(track_pos)
+            self.keys[track_pos] = key
+
+        doppler = float(last_measurement[MD])
+        old_doppler = self.track_dopplers[track_pos]
+        if doppler != old_doppler:
+            del self.dopplers[bisect.bisect_left(self.dopplers, (old_doppler, track_pos))]
+            bisect.insort(self.dopplers, (doppler, track_pos))
+            self.track_dopplers[track_pos] = doppler
+
+    def doppler_window(self, doppler):
+        # Bounds of the sorted entries with |track Doppler - doppler| < doppler_threshold
+        lo = bisect.bisect_right(self.dopplers, (doppler - self.doppler_threshold, np.inf))
+        hi = bisect.bisect_left(self.dopplers, (doppler + self.doppler_threshold, -1))
+        return lo, max(lo, hi)
+
+    def best_match(self, tracks, measurement):
+        # Closest correlated track to the measurement, or None
+        lo, hi = self.doppler_window(float(measurement[MD]))
+        cell = self.cell_key(measurement)
+        neighbour_cells = [self.cells.get(tuple(c + d for c, d in zip(cell, offset)), ())
+                           for offset in itertools.product((-1, 0, 1), repeat=3)]
+        if hi - lo <= sum(map(len, neighbour_cells)):
+            # Every track in the window is Doppler-correlated already
+            candidates = sorted(track_pos for _, track_pos in self.dopplers[lo:hi])
+            doppler_checked = True
+        else:
+            candidates = sorted(itertools.chain.from_iterable(neighbour_cells))
+            doppler_checked = False
+
+        best_pos = None
+        best_distance = self.range_threshold
+        for track_pos in candidates:
+            last_measurement = tracks[track_pos]['measurements'][-1][0]
+            if not doppler_checked and not doppler_correlation(measurement[MD], last_measurement[MD],
+                                                               self.doppler_threshold):
+                continue
+            distance = np.linalg.norm(measurement[MX:MZ + 1] - last_measurement[MX:MZ + 1])
+            if distance < best_distance:
+                best_pos, best_distance = track_pos, distance
+        return best_pos
+
+def gaussian_log_normalizers(covs):
+    # -log det(2 pi S) / 2 for one covariance or a stack of them
+    _, log_det = np.linalg.slogdet(2 * np.pi * np.asarray(covs, dtype=float))
+    return -0.5 * log_det
+
+def jpda_log_likelihoods(track_positions, reports, covs, distances=None):
+    # Gaussian log-likelihood of every track/report pair, -(d^2 + log det(2 pi S)) / 2, as a
+    # tracks x reports matrix. covs is shared (3 x 3) or per track (tracks x 3 x 3).
+    covs = np.asarray(covs, dtype=float)
+    if distances is None:
+        distances = mahalanobis_distance_matrix(track_positions, reports, covs)
+    log_normalizers = gaussian_log_normalizers(covs)
+    if covs.ndim == 3:
+        log_normalizers = log_normalizers[:, np.newaxis]
+    return log_normalizers - 0.5 * distances
+
+def jpda_cluster_probabilities(log_likelihoods):
+    # Normalise a cluster's pair log-likelihoods with log-sum-exp, so distant pairs never underflow
+    # into 0/0. Returns the pair probabilities over the whole cluster and the marginal association
+    # probabilities of each track over the cluster's reports, both as tracks x reports arrays.
+    pair_probabilities = np.exp(log_likelihoods - logsumexp(log_likelihoods))
+    marginals = np.exp(log_likelihoods - logsumexp(log_likelihoods, axis=1, keepdims=True))
+    return pair_probabilities, marginals
+
+# Joint-event JPDA parameters
+JPDA_MAX_HYPOTHESES = 100  # Joint hypotheses enumerated per cluster before the search is cut off
+JPDA_PRUNE_LOG_RATIO = 20.0  # Hypotheses less likely than the best by more than exp(-20) are pruned
+
+def solve_assignment(cost_matrix):
+    # Optimal assignment of every row, or None when no assignment avoids the forbidden (inf) entries
+    try:
+        row_ind, col_ind = linear_sum_assignment(cost_matrix)
+    except ValueError:
+        return None
+    total = cost_matrix[row_ind, col_ind].sum()
+    if len(row_ind) < cost_matrix.shape[0] or not np.isfinite(total):
+        return None
+    return total, col_ind
+
+def murty_k_best(cost_matrix, max_solutions, prune_cost=np.inf):
+    # Murty's k-best assignment: lowest-cost assignments of every row of cost_matrix, best first.
+    # Solutions costing more than the best by prune_cost are dropped. Returns (totals, columns per
+    # row as a solutions x rows array, truncated), where truncated means the max_solutions budget
+    # stopped the search while feasible assignments were still queued.
+    cost_matrix = np.asarray(cost_matrix, dtype=float)
+    num_rows = cost_matrix.shape[0]
+    best = solve_assignment(cost_matrix)
+    if best is None:
+        return np.empty(0), np.empty((0, num_rows), dtype=np.intp), False
+
+    limit = best[0] + prune_cost
+    counter = itertools.count()
+    queue = [(best[0], next(counter), cost_matrix, best[1])]
+    totals = []
+    solutions = []
+    while queue and len(solutions) < max_solutions:
+        total, _, node_cost, cols = heapq.heappop(queue)
+        totals.append(total)
+        solutions.append(cols)
+
+        # Partition the rest of this node's solution space: child i keeps the first i assignments
+        # of this solution and forbids assignment i
+        node_cost = node_cost.copy()
+        for row in range(num_rows):
+            child_cost = node_cost.copy()
+            child_cost[row, cols[row]] = np.inf
+            child = solve_assignment(child_cost)
+            if child is not None and child[0] <= limit:
+                heapq.heappush(queue, (child[0], next(counter), child_cost, child[1]))
+            kept = node_cost[row, cols[row]]
+            node_cost[row, :] = np.inf
+            node_cost[:, cols[row]] = np.inf
+            node_cost[row, cols[row]] = kept
+
+    return np.array(totals), np.array(solutions, dtype=np.intp), bool(queue)
+
+def joint_jpda_cluster(log_likelihoods, feasible, miss_log_likelihoods, max_hypotheses=JPDA_MAX_HYPOTHESES):
+    # Enumerate the joint association events of a cluster with Murty's k-best assignment. Every track
+    # takes one feasible report or is missed (scored with its miss_log_likelihoods entry), and no
+    # report goes to two tracks. Returns (event assignments as hypotheses x tracks report indices with
+    # -1 for a miss, marginal probabilities as tracks x (reports + 1) with the miss probability in the
+    # last column, truncated).
+    if max_hypotheses < 1:
+        raise ValueError(f"max_hypotheses must be at least 1, got {max_hypotheses}")
+    num_tracks, num_reports = log_likelihoods.shape
+    miss_cost = np.full((num_tracks, num_tracks), np.inf)
+    np.fill_diagonal(miss_cost, -np.asarray(miss_log_likelihoods, dtype=float))
+    cost_matrix = np.hstack((np.where(feasible, -log_likelihoods, np.inf), miss_cost))
+
+    totals, solutions, truncated = murty_k_best(cost_matrix, max_hypotheses, JPDA_PRUNE_LOG_RATIO)
+    weights = np.exp(-totals - logsumexp(-totals))
+    events = np.where(solutions < num_reports, solutions, -1)
+
+    marginals = np.zeros((num_tracks, num_reports + 1))
+    track_idx = np.broadcast_to(np.arange(num_tracks), events.shape)
+    np.add.at(marginals, (track_idx, np.where(events >= 0, events, num_reports)),
+              np.broadcast_to(weights[:, np.newaxis], events.shape))
+    return events, marginals, truncated
+
+COALESCENCE_RADIUS = 100.0  # Tracks whose positions are closer than this (metres) are merged by JPDA
+COALESCENCE_MAX_CELLS_PER_AXIS = 1 << 20
+
+def spatial_hash_neighbour_pairs(positions, radius):
+    # Pairs (i < j) of points closer than radius. Points are hashed into a grid of cells at least
+    # radius wide, so each point is only compared with points in its own and the 26 adjacent cells.
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    n = len(positions)
+    if n < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    origin = positions.min(axis=0)
+    span = positions.max(axis=0) - origin
+    # Coarser cells keep the packed cell keys inside int64 for very spread-out scenes
+    cell_size = max(radius, span.max() / COALESCENCE_MAX_CELLS_PER_AXIS, np.finfo(float).tiny)
+    cells = np.floor((positions - origin) / cell_size).astype(np.int64) + 1
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    first_rows = []
+    second_rows = []
+    for offset in itertools.product((-1, 0, 1), repeat=3):
+        neighbour_keys = keys + (offset[0] * dims[1] + offset[1]) * dims[2] + offset[2]
+        starts = np.searchsorted(sorted_keys, neighbour_keys, side='left')
+        counts = np.searchsorted(sorted_keys, neighbour_keys, side='right') - starts
+        if not counts.any():
+            continue
+        # Expand every point against the members of its neighbouring cell
+        first = np.repeat(np.arange(n), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = order[np.repeat(starts, counts) + within]
+        keep = first < second
+        first_rows.append(first[keep])
+        second_rows.append(second[keep])
+
+    first = np.concatenate(first_rows)
+    second = np.concatenate(second_rows)
+    close = np.einsum('ij,ij->i', positions[first] - positions[second], positions[first] - positions[second]) < radius ** 2
+    return first[close], second[close]
+
+def coalescence_representatives(num_points, first, second):
+    # Representative of every point for the neighbour pairs (first < second): taken in index order,
+    # a point joins the lowest-index representative it is directly paired with, otherwise it becomes
+    # a representative itself. Merges never chain through a merged point. Points are settled in
+    # rounds, each settling every point whose lower-index neighbours are all settled.
+    representative = np.full(num_points, -1, dtype=np.intp)
+    while (representative < 0).any():
+        blocked = np.zeros(num_points, dtype=bool)
+        blocked[second[representative[first] < 0]] = True
+        ready = (representative < 0) & ~blocked
+        joins = ready[second] & (representative[first] == first)
+        target = np.full(num_points, num_points, dtype=np.intp)
+        np.minimum.at(target, second[joins], first[joins])
+        ready_points = np.flatnonzero(ready)
+        representative[ready_points] = np.where(target[ready_points] < num_points, target[ready_points], ready_points)
+    return representative
+
+def coalesce_best_reports(best_reports, track_positions, radius=COALESCENCE_RADIUS):
+    # Tracks within radius of an earlier representative track are merged into it in one step: the
+    # group keeps the representative's track and report column and the mean of the group's reports.
+    if not best_reports:
+        return []
+    tracks = np.array([track for track, _, _ in best_reports], dtype=np.intp)
+    reports = np.array([np.asarray(report, dtype=float) for _, _, report in best_reports]).reshape(len(tracks), -1)
+    first, second = spatial_hash_neighbour_pairs(track_positions[tracks], radius)
+    representative = coalescence_representatives(len(tracks), first, second)
+
+    group_sizes = np.bincount(representative, minlength=len(tracks))
+    group_reports = np.zeros(reports.shape)
+    np.add.at(group_reports, representative, reports)
+    leaders = np.flatnonzero(group_sizes)
+    group_reports[leaders] /= group_sizes[leaders, np.newaxis]
+    return [(tracks[i], best_reports[i][1], group_reports[i]) for i in leaders]
+
+def perform_jpda(tracks, reports, kalman_filter, innovation_covs=None, mode='pairwise',
+                 max_hypotheses=JPDA_MAX_HYPOTHESES, candidate_pairs=None):
+    # mode 'pairwise' scores independent track/report pairs; 'joint' evaluates joint association
+    # events with a budget of max_hypotheses per cluster
+    gated_track_idx, gated_report_idx, index_clusters = gated_clusters(
+        tracks, reports, kalman_filter, innovation_covs, candidate_pairs=candidate_pairs
+    )
+    clusters = [(cluster_tracks.tolist(), [reports[r] for r in cluster_reports])
+                for cluster_tracks, cluster_reports in index_clusters]
+    if mode == 'joint' and index_clusters:
+        track_local, report_local, pair_order, pair_bounds = cluster_pair_layout(
+            gated_track_idx, gated_report_idx, index_clusters, len(tracks), len(reports)
+        )
+    track_positions = np.asarray(tracks, dtype=float).reshape(-1, 3)
+    covs = gating_covariances(kalman_filter, innovation_covs)
     best_reports = []
     hypotheses = []
     probabilities = []
 
-    for cluster_tracks, cluster_reports in clusters:
-        # Generate hypotheses for each cluster
-        cluster_hypotheses = []
-        cluster_probabilities = []
-        for track in cluster_tracks:
-            for report in cluster_reports:
-                # Calculate the probability of the hypothesis
-                cov_inv = np.linalg.inv(kalman_filter.Pp[:3, :3])
-                residual = np.array(report) - np.array(track)
-                probability = np.exp(-0.5 * np.dot(np.dot(residual.T, cov_inv), residual))
-                cluster_hypotheses.append((track, report))
-                cluster_probabilities.append(probability)
-
-        # Normalize probabilities
-        total_probability = sum(cluster_probabilities)
-        cluster_probabilities = [p / total_probability for p in cluster_probabilities]
+    for cluster_idx, (cluster_tracks, cluster_reports) in enumerate(clusters):
+        report_columns = index_clusters[cluster_idx][1]
+        # Score every track/report hypothesis of the cluster in one pass
+        cluster_positions = track_positions[cluster_tracks]
+        cluster_reports = np.asarray(cluster_reports, dtype=float)
+        cluster_covs = covs[cluster_tracks] if covs.ndim == 3 else covs
+
+        if mode == 'joint':
+            distances = mahalanobis_distance_matrix(cluster_positions, cluster_reports, cluster_covs)
+            log_likelihoods = jpda_log_likelihoods(cluster_positions, cluster_reports, cluster_covs, distances)
+            # A miss is scored like a report on the gate boundary
+            miss_log_likelihoods = np.broadcast_to(
+                gaussian_log_normalizers(cluster_covs) - 0.5 * kalman_filter.gate_threshold, len(cluster_tracks)
+            )
+            # Only pairs that passed every gate can be part of a joint event
+            pairs = pair_order[pair_bounds[cluster_idx]:pair_bounds[cluster_idx + 1]]
+            feasible = np.zeros(distances.shape, dtype=bool)
+            feasible[track_local[gated_track_idx[pairs]], report_local[gated_report_idx[pairs]]] = True
+            events, marginals, truncated = joint_jpda_cluster(
+                log_likelihoods, feasible, miss_log_likelihoods, max_hypotheses
+            )
+            if truncated:
+                print(f"JPDA cluster {cluster_idx}: hypothesis budget of {max_hypotheses} reached, "
+                      f"probabilities computed from the {len(events)} most likely joint events")
+
+            # Reports of the most likely joint event go to their tracks
+            for track_idx, report_idx in enumerate(events[0]):
+                if report_idx >= 0:
+                    best_reports.append((cluster_tracks[track_idx], report_columns[report_idx],
+                                         cluster_reports[report_idx]))
+            hypotheses.append(events)
+            probabilities.append(marginals)
+            continue
+
+        log_likelihoods = jpda_log_likelihoods(cluster_positions, cluster_reports, cluster_covs)
+        cluster_probabilities, marginals = jpda_cluster_probabilities(log_likelihoods)
 
         # Select the best hypothesis based on the highest probability
-        best_hypothesis_index = np.argmax(cluster_probabilities)
-        best_track, best_report = cluster_hypotheses[best_hypothesis_index]
+        best_track_idx, best_report_idx = np.unravel_index(np.argmax(cluster_probabilities), cluster_probabilities.shape)
+        best_track = cluster_tracks[best_track_idx]
+        best_report = cluster_reports[best_report_idx]
 
         # Bias Removal
-        bias = np.mean([np.array(report) - np.array(track) for track, report in cluster_hypotheses], axis=0)
+        bias = np.mean(cluster_reports[np.newaxis, :, :] - cluster_positions[:, np.newaxis, :], axis=(0, 1))
         best_report = best_report - bias
 
-        best_reports.append((best_track, best_report))
-        hypotheses.append(cluster_hypotheses)
-        probabilities.append(cluster_probabilities)
+        best_reports.append((best_track, report_columns[best_report_idx], best_report))
+        # Hypotheses as (track index, report index within the cluster), ordered like the flattened probabilities
+        hypotheses.append(np.stack(np.meshgrid(cluster_tracks, np.arange(len(cluster_reports)), indexing='ij'), axis=-1).reshape(-1, 2))
+        probabilities.append(marginals)
 
     # Track Coalescence
-    coalesced_tracks = []
-    for i, (track, report) in enumerate(best_reports):
-        merged = False
-        for j, (other_track, other_report) in enumerate(coalesced_tracks):
-            distance = np.linalg.norm(np.array(track) - np.array(other_track))
-            if distance < kalman_filter.gate_threshold:  # Use a suitable threshold
-                # Merge tracks
-                coalesced_tracks[j] = ((np.array(track) + np.array(other_track)) / 2, (np.array(report) + np.array(other_report)) / 2)
-                merged = True
-                break
-        if not merged:
-            coalesced_tracks.append((track, report))
+    coalesced_tracks = coalesce_best_reports(best_reports, track_positions)
 
     # Log clusters, hypotheses, and probabilities
     print("JPDA Clusters:", clusters)
@@ -305,27 +1392,245 @@ def perform_jpda(tracks, reports, kalman_filter):
 
     return clusters, coalesced_tracks, hypotheses, probabilities
 
-def perform_munkres(tracks, reports, kalman_filter):
-    cost_matrix = []
-    cov_inv = np.linalg.inv(kalman_filter.Pp[:3, :3])
+def assign_gated_pairs(track_idx, report_idx, distances, num_tracks, num_reports, gate_threshold):
+    # Minimum-cost assignment restricted to gated pairs. The gating graph is split into independent
+    # clusters and each one is solved on its own, so the cost grows with cluster size rather than with
+    # tracks x reports. Returns (assigned track indices, assigned report indices, number of clusters).
+    track_idx = np.asarray(track_idx, dtype=np.intp)
+    report_idx = np.asarray(report_idx, dtype=np.intp)
+    distances = np.asarray(distances, dtype=float)
+    clusters = gated_pair_clusters(track_idx, report_idx, num_tracks, num_reports)
+    if not clusters:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), 0
+
+    track_local, report_local, pair_order, pair_bounds = cluster_pair_layout(
+        track_idx, report_idx, clusters, num_tracks, num_reports
+    )
+
+    rows = []
+    cols = []
+    for cluster_idx, (cluster_tracks, cluster_reports) in enumerate(clusters):
+        pairs = pair_order[pair_bounds[cluster_idx]:pair_bounds[cluster_idx + 1]]
+        if len(pairs) == 1:
+            rows.append(track_idx[pairs])
+            cols.append(report_idx[pairs])
+            continue
 
-    for track in tracks:
-        track_costs = []
-        for report in reports:
-            distance = mahalanobis_distance(track, report, cov_inv)
-            track_costs.append(distance)
-        cost_matrix.append(track_costs)
+        # Pairs outside the gate cost more than any set of gated pairs and are dropped from the result
+        infeasible_cost = gate_threshold * (min(len(cluster_tracks), len(cluster_reports)) + 1)
+        cost_matrix = np.full((len(cluster_tracks), len(cluster_reports)), infeasible_cost)
+        cost_matrix[track_local[track_idx[pairs]], report_local[report_idx[pairs]]] = distances[pairs]
+        row_ind, col_ind = linear_sum_assignment(cost_matrix)
+        feasible = cost_matrix[row_ind, col_ind] < infeasible_cost
+        rows.append(cluster_tracks[row_ind[feasible]])
+        cols.append(cluster_reports[col_ind[feasible]])
+
+    return np.concatenate(rows), np.concatenate(cols), len(clusters)
+
+def greedy_gated_pairs(track_idx, report_idx, distances, num_tracks, num_reports):
+    # Global nearest neighbour over gated pairs: pairs are taken in order of increasing distance unless
+    # their track or report is already used. Each round accepts every pair that is the closest
+    # remaining pair of both its track and its report, which is what the sequential greedy pass would
+    # take, so the sparse pair list is processed with a few array passes instead of a Python loop.
+    order = np.argsort(np.asarray(distances, dtype=float), kind='stable')
+    track_idx = np.asarray(track_idx, dtype=np.intp)[order]
+    report_idx = np.asarray(report_idx, dtype=np.intp)[order]
+    track_used = np.zeros(num_tracks, dtype=bool)
+    report_used = np.zeros(num_reports, dtype=bool)
+    rows = []
+    cols = []
+    while track_idx.size:
+        closest_of_track = np.zeros(track_idx.size, dtype=bool)
+        closest_of_track[np.unique(track_idx, return_index=True)[1]] = True
+        closest_of_report = np.zeros(report_idx.size, dtype=bool)
+        closest_of_report[np.unique(report_idx, return_index=True)[1]] = True
+        accepted = closest_of_track & closest_of_report
+        rows.append(track_idx[accepted])
+        cols.append(report_idx[accepted])
+        track_used[track_idx[accepted]] = True
+        report_used[report_idx[accepted]] = True
+        remaining = ~(track_used[track_idx] | report_used[report_idx])
+        track_idx, report_idx = track_idx[remaining], report_idx[remaining]
+    if not rows:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate(rows), np.concatenate(cols)
+
+def perform_gnn(tracks, reports, kalman_filter, innovation_covs=None, coarse_gating=None, candidate_pairs=None):
+    gate_threshold = kalman_filter.gate_threshold
+    cov = gating_covariances(kalman_filter, innovation_covs)
+    track_idx, report_idx, distances = gate_pairs(tracks, reports, cov, gate_threshold, coarse_gating, candidate_pairs)
+
+    row_ind, col_ind = greedy_gated_pairs(track_idx, report_idx, distances, len(tracks), len(reports))
+    best_reports = [(row, col, reports[col]) for row, col in zip(row_ind, col_ind)]
+
+    # Log gated pairs and assignments
+    print(f"GNN Gated Pairs: {len(track_idx)}")
+    print("GNN Assignments:", list(zip(row_ind, col_ind)))
+    print("GNN Best Reports:", best_reports)
 
-    row_ind, col_ind = linear_sum_assignment(cost_matrix)
-    best_reports = [(row, reports[col]) for row, col in zip(row_ind, col_ind)]
+    return best_reports
+
+def perform_munkres(tracks, reports, kalman_filter, innovation_covs=None, coarse_gating=None, candidate_pairs=None):
+    gate_threshold = kalman_filter.gate_threshold
+    cov = gating_covariances(kalman_filter, innovation_covs)
+    track_idx, report_idx, distances = gate_pairs(tracks, reports, cov, gate_threshold, coarse_gating, candidate_pairs)
 
-    # Log cost matrix and assignments
-    print("Munkres Cost Matrix:", cost_matrix)
+    row_ind, col_ind, num_clusters = assign_gated_pairs(
+        track_idx, report_idx, distances, len(tracks), len(reports), gate_threshold
+    )
+    best_reports = [(row, col, reports[col]) for row, col in zip(row_ind, col_ind)]
+
+    # Log gated pairs and assignments
+    print(f"Munkres Gated Pairs: {len(track_idx)} in {num_clusters} clusters")
     print("Munkres Assignments:", list(zip(row_ind, col_ind)))
     print("Munkres Best Reports:", best_reports)
 
     return best_reports
 
+class AuctionAssociator:
+    # Epsilon-scaling auction over gated track/report pairs. A track's benefit for a report is
+    # gate_threshold - d^2. To let tracks and reports stay unassigned the problem is made square:
+    # every track gets a private "no report" object and every report a "no track" bidder, linked to
+    # each other along the gated pairs with benefit 0. The track profits (dual variables) of the
+    # last scan are kept by track key and turned into starting report prices on the next scan, so
+    # a slowly changing scene settles in a few bidding rounds. A phase that runs out of its
+    # max_rounds budget leaves the scan to the minimum-cost assignment instead.
+    def __init__(self, epsilon_final=1e-3, scaling_factor=4.0, max_rounds=10000):
+        self.epsilon_final = epsilon_final
+        self.scaling_factor = scaling_factor
+        self.max_rounds = max_rounds  # Bidding rounds allowed per epsilon phase
+        self.profits = {}  # Track key -> profit at the end of the previous scan
+        self.last_rounds = 0
+        self.last_fallback = False
+
+    def forget(self, track_key):
+        # Drop the carried profit of a deleted track so a new track reusing its key starts cold
+        self.profits.pop(track_key, None)
+
+    def assign(self, track_idx, report_idx, benefits, num_tracks, num_reports, track_keys=None):
+        # Returns (assigned track indices, assigned report indices)
+        track_idx = np.asarray(track_idx, dtype=np.intp)
+        report_idx = np.asarray(report_idx, dtype=np.intp)
+        benefits = np.asarray(benefits, dtype=float)
+        self.last_rounds = 0
+        self.last_fallback = False
+        if track_idx.size == 0:
+            self.profits = {} if track_keys is None else dict.fromkeys(track_keys, 0.0)
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+        # Only tracks and reports on a gated pair take part
+        tracks, local_tracks = np.unique(track_idx, return_inverse=True)
+        reports, local_reports = np.unique(report_idx, return_inverse=True)
+        n_t, n_r = len(tracks), len(reports)
+
+        # Bidders: tracks, then one per report. Objects: reports, then one per track.
+        pair_count = len(track_idx)
+        bidders = np.concatenate((local_tracks, np.arange(n_t), n_t + np.arange(n_r), n_t + local_reports))
+        objects = np.concatenate((local_reports, n_r + np.arange(n_t), np.arange(n_r), n_r + local_tracks))
+        edge_benefits = np.concatenate((benefits, np.zeros(n_t + n_r + pair_count)))
+
+        prices = np.zeros(n_r + n_t)
+        warm = False
+        if track_keys is not None and self.profits:
+            profits = np.array([self.profits.get(track_keys[t], np.nan) for t in tracks])
+            known = ~np.isnan(profits[local_tracks])
+            if known.any():
+                # Prices consistent with last scan's profits: p_j = max over known tracks of b_tj - profit_t
+                np.maximum.at(prices, local_reports[known], benefits[known] - profits[local_tracks][known])
+                # Stale profits must not price reports outside the range of this scan's benefits
+                np.clip(prices, 0.0, benefits.max(), out=prices)
+                warm = True
+        # A warm start skips the first two scaling phases but stays on the scale of the benefits
+        epsilon = max(benefits.max() / 2, self.epsilon_final)
+        if warm:
+            epsilon = max(epsilon / self.scaling_factor ** 2, self.epsilon_final)
+
+        while True:
+            assignment, prices = self.auction_phase(bidders, objects, edge_benefits, n_t + n_r, prices, epsilon)
+            if (assignment[bidders] == -1).any():
+                return self.fallback(track_idx, report_idx, benefits, num_tracks, num_reports, track_keys)
+            if epsilon <= self.epsilon_final:
+                break
+            epsilon = max(epsilon / self.scaling_factor, self.epsilon_final)
+
+        track_objects = assignment[:n_t]
+        matched = track_objects < n_r
+        if track_keys is not None:
+            profits = np.zeros(num_tracks)
+            edge_of = {(b, o): k for k, (b, o) in enumerate(zip(local_tracks.tolist(), local_reports.tolist()))}
+            for t in np.flatnonzero(matched).tolist():
+                profits[tracks[t]] = benefits[edge_of[(t, int(track_objects[t]))]] - prices[track_objects[t]]
+            profits[tracks[~matched]] = -prices[track_objects[~matched]]
+            self.profits = dict(zip(track_keys, profits.tolist()))
+        return tracks[matched], reports[track_objects[matched]]
+
+    def fallback(self, track_idx, report_idx, benefits, num_tracks, num_reports, track_keys):
+        # Minimum-cost assignment of the same gated pairs; the bidding's duals are not valid, so
+        # the next scan starts cold
+        print(f"Auction did not settle within {self.max_rounds} rounds per phase, "
+              f"falling back to the minimum-cost assignment")
+        self.last_fallback = True
+        self.profits = {}
+        # Benefits are gate_threshold - d^2, so costs of cost_bound - benefits order the pairs like d^2
+        cost_bound = benefits.max()
+        row_ind, col_ind, _ = assign_gated_pairs(
+            track_idx, report_idx, cost_bound - benefits, num_tracks, num_reports, cost_bound
+        )
+        return row_ind, col_ind
+
+    def auction_phase(self, bidders, objects, benefits, size, prices, epsilon):
+        # Jacobi auction on a square problem: every unassigned bidder bids at once and each object
+        # goes to its highest bidder. Stops after max_rounds bidding rounds; bidders still at -1
+        # then mark the phase as unfinished. Returns (object of every bidder, prices).
+        assignment = np.full(size, -1, dtype=np.intp)
+        owner = np.full(size, -1, dtype=np.intp)
+        prices = prices.copy()
+        for _ in range(self.max_rounds):
+            bidding = assignment[bidders] == -1
+            if not bidding.any():
+                break
+            self.last_rounds += 1
+
+            # Best and second-best value of every bidding bidder (each has at least two objects)
+            bid_from = bidders[bidding]
+            bid_for = objects[bidding]
+            values = benefits[bidding] - prices[bid_for]
+            order = np.lexsort((-values, bid_from))
+            bid_from, bid_for, values = bid_from[order], bid_for[order], values[order]
+            first = np.flatnonzero(np.r_[True, bid_from[1:] != bid_from[:-1]])
+            bids = prices[bid_for[first]] + values[first] - values[first + 1] + epsilon
+            bid_from, bid_for = bid_from[first], bid_for[first]
+
+            # The highest bid on each object wins it and displaces its previous owner
+            order = np.lexsort((-bids, bid_for))
+            bid_for, bid_from, bids = bid_for[order], bid_from[order], bids[order]
+            winners = np.flatnonzero(np.r_[True, bid_for[1:] != bid_for[:-1]])
+            won_objects, won_by = bid_for[winners], bid_from[winners]
+            displaced = owner[won_objects]
+            assignment[displaced[displaced >= 0]] = -1
+            owner[won_objects] = won_by
+            assignment[won_by] = won_objects
+            prices[won_objects] = bids[winners]
+        return assignment, prices
+
+def perform_auction(tracks, reports, kalman_filter, associator, innovation_covs=None, track_keys=None,
+                    coarse_gating=None, candidate_pairs=None):
+    gate_threshold = kalman_filter.gate_threshold
+    cov = gating_covariances(kalman_filter, innovation_covs)
+    track_idx, report_idx, distances = gate_pairs(tracks, reports, cov, gate_threshold, coarse_gating, candidate_pairs)
+
+    row_ind, col_ind = associator.assign(
+        track_idx, report_idx, gate_threshold - distances, len(tracks), len(reports), track_keys
+    )
+    best_reports = [(row, col, reports[col]) for row, col in zip(row_ind, col_ind)]
+
+    # Log assignments
+    print(f"Auction Gated Pairs: {len(track_idx)}, bidding rounds: {associator.last_rounds}")
+    print("Auction Assignments:", list(zip(row_ind, col_ind)))
+    print("Auction Best Reports:", best_reports)
+
+    return best_reports
+
 def check_track_timeout(tracks, current_time, poss_timeout=20.0, firm_tent_timeout=50.0):
     tracks_to_remove = []
     for track_id, track in enumerate(tracks):
@@ -396,8 +1701,10 @@ def log_to_csv(log_file_path, data):
         writer = csv.DictWriter(csvfile, fieldnames=data.keys())
         writer.writerow(data)
 
-def main(input_file, track_mode, filter_option, association_type):
+def main(input_file, track_mode, filter_option, association_type, jpda_mode='pairwise',
+         jpda_max_hypotheses=JPDA_MAX_HYPOTHESES):
     log_file_path = 'detailed_log.csv'
+    TRANSITION_CACHE.clear()  # Cache statistics below cover this run only
 
     # Initialize CSV log file
     with open(log_file_path, 'w', newline='') as csvfile:
@@ -409,16 +1716,26 @@ def main(input_file, track_mode, filter_option, association_type):
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
 
-    measurements = read_measurements_from_csv(input_file)
-
     if filter_option == "CV":
-        kalman_filter = CVFilter()
+        kalman_filter = KalmanFilterBank(CVModel())
     elif filter_option == "CA":
         kalman_filter = CAFilter()
+    elif filter_option == "CT":
+        kalman_filter = CTFilter()
+    elif filter_option == "IMM":
+        kalman_filter = IMMFilterBank()
     else:
         raise ValueError("Invalid filter option selected.")
+    if association_type == "JPDA" and jpda_mode == 'joint' and jpda_max_hypotheses < 1:
+        raise ValueError("JPDA hypothesis budget must be at least 1.")
 
-    measurement_groups = form_measurement_groups(measurements, max_time_diff=0.050)
+    try:
+        input_source = cached_measurement_file(input_file)
+    except OSError as e:
+        print(f"Measurement cache unavailable ({e}), parsing {input_file} directly")
+        input_source = input_file
+
+    measurement_groups = iter_measurement_groups(iter_measurement_chunks(input_source), max_time_diff=0.050)
 
     tracks = []
     track_id_list = []
@@ -427,7 +1744,9 @@ def main(input_file, track_mode, filter_option, association_type):
     doppler_threshold = 100
     range_threshold = 100
     firm_threshold = select_initiation_mode(track_mode)
-    association_method = association_type  # 'JPDA' or 'Munkres'
+    track_index = TrackLookupIndex(range_threshold, doppler_threshold)
+    association_method = association_type  # 'JPDA', 'Munkres', 'Auction' or 'GNN'
+    auction_associator = AuctionAssociator()
 
     # Initialize variables outside the loop
     miss_counts = {}
@@ -454,6 +1773,8 @@ def main(input_file, track_mode, filter_option, association_type):
             tracks_to_remove = check_track_timeout(tracks, current_time)
             for track_id in reversed(tracks_to_remove):
                 print(f"Removing track {track_id} due to timeout")
+                kalman_filter.release(tracks[track_id]['filter_slot'])
+                auction_associator.forget(tracks[track_id]['track_id'])
                 del tracks[track_id]
                 track_id_list[track_id]['state'] = 'free'
                 if track_id in firm_ids:
@@ -464,55 +1785,45 @@ def main(input_file, track_mode, filter_option, association_type):
                     del hit_counts[track_id]
                 if track_id in miss_counts:
                     del miss_counts[track_id]
+            if tracks_to_remove:
+                track_index.rebuild(tracks)
             last_check_time = current_time
 
         if len(group) == 1:  # Single measurement
-            measurement = group[0]
+            measurement = group[0].copy()  # A view would keep the whole input chunk alive
             assigned = False
-            for track_id, track in enumerate(tracks):                
-                if correlation_check(track, measurement, doppler_threshold, range_threshold):
-                    current_state = state_map.get(track_id, None)
-                    if current_state == 'Poss1':
-                        initialize_filter_state(kalman_filter, *sph2cart(*measurement[:3]), 0, 0, 0, measurement[3])
-                    elif current_state == 'Tentative1':
-                        last_measurement = track['measurements'][-1][0]
-                        dt = measurement[3] - last_measurement[3]
-                        vx = (sph2cart(*measurement[:3])[0] - sph2cart(*last_measurement[:3])[0]) / dt
-                        vy = (sph2cart(*measurement[:3])[1] - sph2cart(*last_measurement[:3])[1]) / dt
-                        vz = (sph2cart(*measurement[:3])[2] - sph2cart(*last_measurement[:3])[2]) / dt
-                        initialize_filter_state(kalman_filter, *sph2cart(*measurement[:3]), vx, vy, vz, measurement[3])
-                    elif current_state == 'Firm':
-                        kalman_filter.predict_step(measurement[3])
-                        kalman_filter.update_step(np.array((measurement[:3])).reshape(3, 1))
-
-                    track['measurements'].append((measurement, current_state))
-                    track['Sf'].append(kalman_filter.Sf.copy())
-                    track['Sp'].append(kalman_filter.Sp.copy())
-                    track['Pp'].append(kalman_filter.Pp.copy())
-                    track['Pf'].append(kalman_filter.Pf.copy())
-                    hit_counts[track_id] = hit_counts.get(track_id, 0) + 1
-                    assigned = True
+            track_id = track_index.best_match(tracks, measurement)
+            if track_id is not None:
+                track = tracks[track_id]
+                current_state = state_map.get(track_id, None)
+                filter_associated_tracks(kalman_filter, tracks, [track_id], [current_state],
+                                         measurement[MX:MZ + 1], measurement[MT])
 
-                    # Log data to CSV
-                    log_data = {
-                        'Time': measurement[3],
-                        'Measurement X': measurement[5],
-                        'Measurement Y': measurement[6],
-                        'Measurement Z': measurement[7],
-                        'Current State': current_state,
-                        'Correlation Output': 'Yes',
-                        'Associated Track ID': track_id,
-                        'Associated Position X': track['Sf'][-1][0, 0],
-                        'Associated Position Y': track['Sf'][-1][1, 0],
-                        'Associated Position Z': track['Sf'][-1][2, 0],
-                        'Association Type': 'Single',
-                        'Clusters Formed': '',
-                        'Hypotheses Generated': '',
-                        'Probability of Hypothesis': '',
-                        'Best Report Selected': ''
-                    }
-                    log_to_csv(log_file_path, log_data)
-                    break
+                track['measurements'].append((measurement, current_state))
+                append_filter_snapshot(kalman_filter, track)
+                hit_counts[track_id] = hit_counts.get(track_id, 0) + 1
+                track_index.update(track_id, track)
+                assigned = True
+
+                # Log data to CSV
+                log_data = {
+                    'Time': measurement[3],
+                    'Measurement X': measurement[5],
+                    'Measurement Y': measurement[6],
+                    'Measurement Z': measurement[7],
+                    'Current State': current_state,
+                    'Correlation Output': 'Yes',
+                    'Associated Track ID': track_id,
+                    'Associated Position X': track['Sf'][-1][0, 0],
+                    'Associated Position Y': track['Sf'][-1][1, 0],
+                    'Associated Position Z': track['Sf'][-1][2, 0],
+                    'Association Type': 'Single',
+                    'Clusters Formed': '',
+                    'Hypotheses Generated': '',
+                    'Probability of Hypothesis': '',
+                    'Best Report Selected': ''
+                }
+                log_to_csv(log_file_path, log_data)
 
             if not assigned:
                 new_track_id = next((i for i, t in enumerate(track_id_list) if t['state'] == 'free'), None)
@@ -522,19 +1833,23 @@ def main(input_file, track_mode, filter_option, association_type):
                 else:
                     track_id_list[new_track_id]['state'] = 'occupied'
 
+                filter_slot = kalman_filter.allocate()
+                kalman_filter.initialize([filter_slot], measurement[MX:MZ + 1], np.zeros(3), [measurement[MT]])
                 tracks.append({
                     'track_id': new_track_id,
+                    'filter_slot': filter_slot,
                     'measurements': [(measurement, 'Poss1')],
                     'current_state': 'Poss1',
-                    'Sf': [kalman_filter.Sf.copy()],
-                    'Sp': [kalman_filter.Sp.copy()],
-                    'Pp': [kalman_filter.Pp.copy()],
-                    'Pf': [kalman_filter.Pf.copy()]
+                    'Sf': [],
+                    'Sp': [],
+                    'Pp': [],
+                    'Pf': []
                 })
+                append_filter_snapshot(kalman_filter, tracks[-1])
+                track_index.add(tracks[-1])
                 state_map[new_track_id] = 'Poss1'
                 state_transition_times[new_track_id] = {'Poss1': current_time}
                 hit_counts[new_track_id] = 1
-                initialize_filter_state(kalman_filter, *sph2cart(*measurement[:3]), 0, 0, 0, measurement[3])
 
                 # Log data to CSV
                 log_data = {
@@ -557,36 +1872,51 @@ def main(input_file, track_mode, filter_option, association_type):
                 log_to_csv(log_file_path, log_data)
 
         else:  # Multiple measurements
-            reports = [sph2cart(*m[:3]) for m in group]
+            reports = group[:, MX:MZ + 1]
+            # Predict every track to the scan time once; gating and the updates both use that prediction
+            track_slots = np.array([track['filter_slot'] for track in tracks], dtype=np.intp)
+            kalman_filter.predict_step(track_slots, np.full(len(tracks), group[0][MT]))
+            track_positions = kalman_filter.Sp[track_slots] @ kalman_filter.H.T
+            innovation_covs = innovation_covariances(kalman_filter.Pp[track_slots], kalman_filter)
+
+            # Range-rate gate ahead of the positional gates: firm tracks predict their range rate from
+            # the filtered state, younger tracks fall back to their last measured Doppler
+            range_rates = np.array([track['measurements'][-1][0][MD] for track in tracks], dtype=float)
+            firm_tracks = [track_pos for track_pos in range(len(tracks)) if state_map.get(track_pos) == 'Firm']
+            if firm_tracks:
+                predicted = predicted_range_rates(kalman_filter.Sf[track_slots[firm_tracks]])
+                range_rates[firm_tracks] = np.where(np.isfinite(predicted), predicted, range_rates[firm_tracks])
+            candidate_pairs = range_rate_gate_pairs(range_rates, group[:, MD], doppler_threshold)
+
             if association_method == 'JPDA':
                 clusters, best_reports, hypotheses, probabilities = perform_jpda(
-                    [track['measurements'][-1][0][:3] for track in tracks], reports, kalman_filter
+                    track_positions, reports, kalman_filter, innovation_covs, jpda_mode, jpda_max_hypotheses,
+                    candidate_pairs
                 )
             elif association_method == 'Munkres':
-                best_reports = perform_munkres([track['measurements'][-1][0][:3] for track in tracks], reports, kalman_filter)
-
-            for track_id, best_report in best_reports:
+                best_reports = perform_munkres(track_positions, reports, kalman_filter, innovation_covs,
+                                               candidate_pairs=candidate_pairs)
+            elif association_method == 'Auction':
+                best_reports = perform_auction(track_positions, reports, kalman_filter, auction_associator,
+                                               innovation_covs, [track['track_id'] for track in tracks],
+                                               candidate_pairs=candidate_pairs)
+            elif association_method == 'GNN':
+                best_reports = perform_gnn(track_positions, reports, kalman_filter, innovation_covs,
+                                           candidate_pairs=candidate_pairs)
+
+            # One batched filter pass for every track associated in this scan
+            associated_states = [state_map.get(track_id, None) for track_id, _, _ in best_reports]
+            if best_reports:
+                filter_associated_tracks(kalman_filter, tracks, [track_id for track_id, _, _ in best_reports],
+                                         associated_states, [best_report for _, _, best_report in best_reports],
+                                         group[0][MT], predicted=True)
+
+            for (track_id, report_col, best_report), current_state in zip(best_reports, associated_states):
                 print("check the best reports",)
-                current_state = state_map.get(track_id, None)
-                if current_state == 'Poss1':
-                    initialize_filter_state(kalman_filter, *best_report, vx, vy, vz, group[0][3])
-                elif current_state == 'Tentative1':
-                    last_measurement = tracks[track_id]['measurements'][-1][0]
-                    dt = group[0][3] - last_measurement[3]
-                    vx = (best_report[0] - sph2cart(*last_measurement[:3])[0]) / dt
-                    vy = (best_report[1] - sph2cart(*last_measurement[:3])[1]) / dt
-                    vz = (best_report[2] - sph2cart(*last_measurement[:3])[2]) / dt
-                    initialize_filter_state(kalman_filter, *best_report, vx, vy, vz, group[0][3])
-                elif current_state == 'Firm':
-                    kalman_filter.predict_step(group[0][3])
-                    kalman_filter.update_step(np.array(best_report).reshape(3, 1))
-
-                tracks[track_id]['measurements'].append((cart2sph(*best_report) + (group[0][3], group[0][4]), current_state))
-                tracks[track_id]['Sf'].append(kalman_filter.Sf.copy())
-                tracks[track_id]['Sp'].append(kalman_filter.Sp.copy())
-                tracks[track_id]['Pp'].append(kalman_filter.Pp.copy())
-                tracks[track_id]['Pf'].append(kalman_filter.Pf.copy())
+                tracks[track_id]['measurements'].append((group[report_col].copy(), current_state))
+                append_filter_snapshot(kalman_filter, tracks[track_id])
                 hit_counts[track_id] = hit_counts.get(track_id, 0) + 1
+                track_index.update(track_id, tracks[track_id])
 
                 # Log data to CSV
                 log_data = {
@@ -608,9 +1938,9 @@ def main(input_file, track_mode, filter_option, association_type):
                 log_to_csv(log_file_path, log_data)
 
             # Handle unassigned measurements
-            assigned_reports = set(tuple(best_report) for _, best_report in best_reports)
-            for report in reports:
-                if tuple(report) not in assigned_reports:
+            assigned_reports = set(int(report_col) for _, report_col, _ in best_reports)
+            for report_col, (record, report) in enumerate(zip(group, reports)):
+                if report_col not in assigned_reports:
                     new_track_id = next((i for i, t in enumerate(track_id_list) if t['state'] == 'free'), None)
                     if new_track_id is None:
                         new_track_id = len(track_id_list)
@@ -618,19 +1948,23 @@ def main(input_file, track_mode, filter_option, association_type):
                     else:
                         track_id_list[new_track_id]['state'] = 'occupied'
 
+                    filter_slot = kalman_filter.allocate()
+                    kalman_filter.initialize([filter_slot], report, np.zeros(3), [group[0][MT]])
                     tracks.append({
                         'track_id': new_track_id,
-                        'measurements': [(cart2sph(*report) + (group[0][3], group[0][4]), 'Poss1')],
+                        'filter_slot': filter_slot,
+                        'measurements': [(record.copy(), 'Poss1')],
                         'current_state': 'Poss1',
-                        'Sf': [kalman_filter.Sf.copy()],
-                        'Sp': [kalman_filter.Sp.copy()],
-                        'Pp': [kalman_filter.Pp.copy()],
-                        'Pf': [kalman_filter.Pf.copy()]
+                        'Sf': [],
+                        'Sp': [],
+                        'Pp': [],
+                        'Pf': []
                     })
+                    append_filter_snapshot(kalman_filter, tracks[-1])
+                    track_index.add(tracks[-1])
                     state_map[new_track_id] = 'Poss1'
                     state_transition_times[new_track_id] = {'Poss1': current_time}
                     hit_counts[new_track_id] = 1
-                    initialize_filter_state(kalman_filter, *report, 0, 0, 0, group[0][3])
 
                     # Log data to CSV
                     log_data = {
@@ -715,6 +2049,8 @@ def main(input_file, track_mode, filter_option, association_type):
             writer.writerow(row)
 
     print(f"Track summary has been written to {csv_file_path}")
+    print(f"Transition cache: {TRANSITION_CACHE.hits} hits, {TRANSITION_CACHE.misses} misses, "
+          f"{len(TRANSITION_CACHE)} entries")
 
     # Add this line at the end of the function
     return tracks
@@ -1019,6 +2355,11 @@ class KalmanFilterGUI(QWidget):
         self.upload_button.clicked.connect(self.select_file)
         control_layout.addWidget(self.upload_button)
 
+        # Convert to Binary Button
+        self.convert_button = QPushButton("Convert to Binary")
+        self.convert_button.clicked.connect(self.convert_input_file)
+        control_layout.addWidget(self.convert_button)
+
         # Process Button
         self.process_button = QPushButton("Process")
         self.process_button.clicked.connect(self.process_data)
@@ -1052,6 +2393,15 @@ class KalmanFilterGUI(QWidget):
         association_layout.addWidget(self.jpda_radio)
         self.munkres_radio = QRadioButton("Munkres")
         association_layout.addWidget(self.munkres_radio)
+        self.auction_radio = QRadioButton("Auction")
+        association_layout.addWidget(self.auction_radio)
+        self.gnn_radio = QRadioButton("GNN")
+        association_layout.addWidget(self.gnn_radio)
+        self.joint_jpda_checkbox = QCheckBox("Joint JPDA (k-best)")
+        association_layout.addWidget(self.joint_jpda_checkbox)
+        self.hypothesis_budget_edit = QLineEdit()
+        self.hypothesis_budget_edit.setPlaceholderText(f"Hypotheses per cluster ({JPDA_MAX_HYPOTHESES})")
+        association_layout.addWidget(self.hypothesis_budget_edit)
         self.association_group.setLayout(association_layout)
         system_config_layout.addWidget(self.association_group)
 
@@ -1064,6 +2414,8 @@ class KalmanFilterGUI(QWidget):
         filter_layout.addWidget(self.ca_filter_button)
         self.ct_filter_button = QPushButton("CT Filter")
         filter_layout.addWidget(self.ct_filter_button)
+        self.imm_filter_button = QPushButton("IMM Filter")
+        filter_layout.addWidget(self.imm_filter_button)
         self.filter_group.setLayout(filter_layout)
         system_config_layout.addWidget(self.filter_group)
 
@@ -1292,6 +2644,7 @@ class KalmanFilterGUI(QWidget):
         self.cv_filter_button.clicked.connect(lambda: self.select_filter("CV"))
         self.ca_filter_button.clicked.connect(lambda: self.select_filter("CA"))
         self.ct_filter_button.clicked.connect(lambda: self.select_filter("CT"))
+        self.imm_filter_button.clicked.connect(lambda: self.select_filter("IMM"))
 
         # Set initial filter mode
         self.filter_mode = "CV"  # Start with CV Filter
@@ -1313,17 +2666,46 @@ class KalmanFilterGUI(QWidget):
     def select_file(self):
         options = QFileDialog.Options()
         file_name, _ = QFileDialog.getOpenFileName(
-            self, "Select Input File", "", "CSV Files (*.csv);;All Files (*)", options=options
+            self, "Select Input File", "",
+            f"CSV Files (*.csv);;Binary Measurement Files (*{MEASUREMENT_FILE_EXT});;All Files (*)", options=options
         )
         if file_name:
             self.input_file = file_name
             print(f"File selected: {self.input_file}")
 
+    def convert_input_file(self):
+        input_file = getattr(self, "input_file", None)
+        if not input_file:
+            print("Please select an input file.")
+            return
+        if input_file.lower().endswith(MEASUREMENT_FILE_EXT):
+            print(f"{input_file} is already a binary measurement file.")
+            return
+        try:
+            self.input_file = convert_csv_to_binary(input_file)
+        except Exception as e:
+            print(f"Error converting input file: {e}")
+
     def process_data(self):
         input_file = getattr(self, "input_file", None)
         track_mode = self.track_mode_combo.currentText()
-        association_type = "JPDA" if self.jpda_radio.isChecked() else "Munkres"
+        if self.jpda_radio.isChecked():
+            association_type = "JPDA"
+        elif self.munkres_radio.isChecked():
+            association_type = "Munkres"
+        elif self.auction_radio.isChecked():
+            association_type = "Auction"
+        else:
+            association_type = "GNN"
         filter_option = self.filter_mode
+        jpda_mode = 'joint' if self.joint_jpda_checkbox.isChecked() else 'pairwise'
+        try:
+            jpda_max_hypotheses = int(self.hypothesis_budget_edit.text() or JPDA_MAX_HYPOTHESES)
+        except ValueError:
+            jpda_max_hypotheses = 0
+        if jpda_max_hypotheses < 1:
+            print("Invalid hypothesis budget (must be a whole number of at least 1), using the default.")
+            jpda_max_hypotheses = JPDA_MAX_HYPOTHESES
 
         if not input_file:
             print("Please select an input file.")
@@ -1334,7 +2716,7 @@ class KalmanFilterGUI(QWidget):
         )
 
         self.tracks = main(
-            input_file, track_mode, filter_option, association_type
+            input_file, track_mode, filter_option, association_type, jpda_mode, jpda_max_hypotheses
         )  # Process data with selected parameters
 
         if self.tracks is None:
@@ -1408,6 +2790,7 @@ class KalmanFilterGUI(QWidget):
         self.cv_filter_button.setChecked(self.filter_mode == "CV")
         self.ca_filter_button.setChecked(self.filter_mode == "CA")
         self.ct_filter_button.setChecked(self.filter_mode == "CT")
+        self.imm_filter_button.setChecked(self.filter_mode == "IMM")
 
     def clear_plot(self):
         self.plot_widget.clear()
@@ -1474,6 +2857,11 @@ class KalmanFilterGUI(QWidget):
 
 
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv[1:]:
+        benchmark_coordinate_kernels()
+        benchmark_transition_cache()
+        sys.exit(0)
+
     app = QApplication(sys.argv)
     ex = KalmanFilterGUI()
     ex.show()